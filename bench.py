@@ -0,0 +1,276 @@
+# === bench.py ===
+# 探索速度のベンチマーク（ローカル専用）
+# 使い方:
+#   python bench.py main.py                        # 固定深さ・固定時間で計測して表を表示
+#   python bench.py main.py --compare main_old.py  # 2つのAIファイルを比較して差分(%)を表示
+#   python bench.py main.py --json result.json     # 結果をJSONでも保存
+#   python bench.py main.py --trace trace.jsonl    # 固定時間計測の探索統計(collect_stats)をJSON Linesで保存
+#   python bench.py --extract                      # ログ(*.log)から局面集 bench_positions.json を作り直す
+# 局面集は対局ログから取り出した序盤・中盤・終盤の局面（手順で保存）
+# 固定深さの計測は alpha_beta を持つAIだけ。固定時間の到達深さ0は定跡や終盤読みなどで反復深化の前に決まった手
+import argparse
+import glob
+import json
+import os
+import re
+import time
+
+import local_driver
+from tournament import WIN_LINES, drop_height, parse_engine_spec
+
+CORPUS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "bench_positions.json")
+MOVE_PATTERN = re.compile(r"^(\d+)手目\s+.*?:\s*[黒白]\s*:\s*\((\d),\s*(\d)\)")
+
+
+# ===== 局面集 =====
+
+def replay(moves: list[list[int]]) -> tuple[local_driver.Board, int, tuple]:
+    """手順から (盤面, 次の手番, 直前の手) を作る"""
+    board = local_driver.create_board()
+    last_move = (None, None, None)
+    for turn, (x, y) in enumerate(moves):
+        z = drop_height(board, x, y)
+        board[z][y][x] = 1 if turn % 2 == 0 else 2
+        last_move = (x, y, z)
+    return board, 1 if len(moves) % 2 == 0 else 2, last_move
+
+
+def is_decided(board: local_driver.Board) -> bool:
+    return any(len({board[z][y][x] for x, y, z in line}) == 1 and board[line[0][2]][line[0][1]][line[0][0]]
+               for line in WIN_LINES)
+
+
+def read_log_moves(path: str) -> list[list[int]]:
+    """サーバ形式のログ（N手目  NAME : 黒 : (x, y)）から手順を読む。途中で矛盾したら空リスト"""
+    moves = []
+    with open(path, encoding="utf-8") as file:
+        for line in file:
+            match = MOVE_PATTERN.match(line.strip())
+            if not match:
+                continue
+            if int(match.group(1)) != len(moves) + 1:
+                return []
+            moves.append([int(match.group(2)), int(match.group(3))])
+    return moves
+
+
+def extract_corpus(log_paths: list[str]) -> list[dict]:
+    """各ログから序盤(6手目)・中盤(全体の半分)・終盤(決着の8手前)の局面を取り出す"""
+    corpus = []
+    for path in log_paths:
+        moves = read_log_moves(path)
+        if len(moves) < 10:
+            continue
+        name = os.path.splitext(os.path.basename(path))[0]
+        picks = {"opening": 6, "middlegame": len(moves) // 2, "endgame": len(moves) - 8}
+        used_plies = set()
+        for phase, ply in picks.items():
+            # 短い対局では中盤と終盤が重なるので、同じ局面は1度だけ入れる
+            if ply < 6 or ply in used_plies:
+                continue
+            used_plies.add(ply)
+            board, _, _ = replay(moves[:ply])
+            if is_decided(board):
+                continue
+            corpus.append({"name": f"{name}@{ply}", "phase": phase, "source": path.replace(os.sep, "/"),
+                           "moves": moves[:ply]})
+    return corpus
+
+
+def load_corpus(path: str = CORPUS_PATH) -> list[dict]:
+    with open(path, encoding="utf-8") as file:
+        return json.load(file)
+
+
+# ===== 計測 =====
+
+def search_stats(ai) -> tuple:
+    """エンジンが持っていれば (ノード数, 置換表の参照数, ヒット数) を返す（なければNone）"""
+    return (getattr(ai, "nodes", None), getattr(ai, "tt_queries", None), getattr(ai, "tt_hits", None))
+
+
+def run_fixed_depth(spec: str, entry: dict, depth: int) -> dict:
+    """深さ1..depthを順に読み、深さdepthまでの累計時間とノード数を測る（alpha_betaがなければ空）"""
+    ai = load_engine_quiet(spec)
+    if not hasattr(ai, "alpha_beta"):
+        return {}
+    board, player, _ = replay(entry["moves"])
+    ai.player_num = player
+    nodes = queries = hits = researches = 0
+    move = None
+    start = time.process_time()
+    for current_depth in range(1, depth + 1):
+        if hasattr(ai, "nodes"):
+            ai.nodes = 0
+        _, move = ai.alpha_beta(board, current_depth, -float("inf"), float("inf"), True, player)
+        node_count, query_count, hit_count = search_stats(ai)
+        nodes += node_count or 0
+        queries = query_count or 0
+        hits = hit_count or 0
+        researches += getattr(ai, "root_researches", 0)
+    elapsed = time.process_time() - start
+    return {"mode": "depth", "time": elapsed, "nodes": nodes, "nps": nodes / elapsed if elapsed > 0 else 0.0,
+            "tt_hit_rate": hits / queries if queries else None, "move": list(move) if move else None,
+            "depth": depth, "researches": researches}
+
+
+def run_fixed_time(spec: str, entry: dict, time_limit: float, trace: bool = False) -> dict:
+    """get_moveを持ち時間time_limitで呼び、到達深さとノード数を測る（traceなら探索統計も取る）"""
+    ai = load_engine_quiet(spec)
+    ai.time_limit = time_limit
+    if trace:
+        ai.collect_stats = True
+    board, player, last_move = replay(entry["moves"])
+    start = time.process_time()
+    move = ai.get_move(board, player, last_move)
+    elapsed = time.process_time() - start
+    # nodes は get_move 全体（ソルバー・完全読み・本探索）の数なので、get_move 全体の時間で割る
+    # （定跡などで探索しなかった手はノード/秒を出さない）
+    nodes, queries, hits = search_stats(ai)
+    result = {"mode": "time", "time": elapsed, "nodes": nodes,
+              "nps": nodes / elapsed if nodes and elapsed > 0 else None,
+              "tt_hit_rate": hits / queries if queries else None, "move": list(move),
+              "depth": getattr(ai, "completed_depth", None)}
+    stats = getattr(ai, "stats", None)
+    if trace and hasattr(stats, "to_dict"):
+        result["search"] = stats.to_dict()
+    return result
+
+
+def load_engine_quiet(spec: str):
+    path, attributes = parse_engine_spec(spec)
+    ai = local_driver.load_ai(path)
+    for key, value in attributes.items():
+        setattr(ai, key, value)
+    return ai
+
+
+def benchmark(spec: str, corpus: list[dict], depth: int, time_limit: float, trace: bool = False) -> list[dict]:
+    results = []
+    for entry in corpus:
+        row = {"name": entry["name"], "phase": entry["phase"]}
+        if depth > 0:
+            fixed_depth = run_fixed_depth(spec, entry, depth)
+            if fixed_depth:
+                row["fixed_depth"] = fixed_depth
+        if time_limit > 0:
+            row["fixed_time"] = run_fixed_time(spec, entry, time_limit, trace)
+        results.append(row)
+    return results
+
+
+# ===== 表示 =====
+
+def format_number(value, pattern: str = "{:,.0f}") -> str:
+    return "-" if value is None else pattern.format(value)
+
+
+def format_table(spec: str, results: list[dict]) -> str:
+    lines = [f"== {spec}"]
+    header = f"{'局面':<24} {'段階':<10} {'深さ時間':>9} {'ノード':>10} {'ノード/秒':>10} {'TTヒット':>8} {'再探索':>6} {'手':>7}" \
+             f" | {'到達深さ':>6} {'ノード/秒':>10} {'手':>7}"
+    lines.append(header)
+    totals = {"time": 0.0, "nodes": 0, "researches": 0}
+    for row in results:
+        fixed_depth = row.get("fixed_depth", {})
+        fixed_time = row.get("fixed_time", {})
+        totals["time"] += fixed_depth.get("time", 0.0)
+        totals["nodes"] += fixed_depth.get("nodes") or 0
+        totals["researches"] += fixed_depth.get("researches") or 0
+        hit_rate = fixed_depth.get("tt_hit_rate")
+        lines.append(
+            f"{row['name']:<24} {row['phase']:<10} "
+            f"{format_number(fixed_depth.get('time'), '{:.3f}s'):>9} {format_number(fixed_depth.get('nodes')):>10} "
+            f"{format_number(fixed_depth.get('nps')):>10} "
+            f"{format_number(hit_rate * 100 if hit_rate is not None else None, '{:.1f}%'):>8} "
+            f"{format_number(fixed_depth.get('researches')):>6} "
+            f"{str(tuple(fixed_depth['move'])) if fixed_depth.get('move') else '-':>7} | "
+            f"{format_number(fixed_time.get('depth'), '{}'):>6} {format_number(fixed_time.get('nps')):>10} "
+            f"{str(tuple(fixed_time['move'])) if fixed_time.get('move') else '-':>7}")
+    nps = totals["nodes"] / totals["time"] if totals["time"] > 0 else 0.0
+    lines.append(f"合計: 深さ時間 {totals['time']:.3f}s / ノード {totals['nodes']:,} / ノード/秒 {nps:,.0f}"
+                 f" / 再探索 {totals['researches']:,}")
+    return "\n".join(lines)
+
+
+def percent(new, old) -> str:
+    if new is None or old is None or old == 0:
+        return "-"
+    return f"{(new - old) / old * 100:+.1f}%"
+
+
+def format_comparison(base_spec: str, base: list[dict], other_spec: str, other: list[dict]) -> str:
+    """base に対する other の差分(%)。時間とノードは減るほど、ノード/秒は増えるほど速い"""
+    lines = [f"== 比較: {other_spec} vs {base_spec}（基準）"]
+    lines.append(f"{'局面':<24} {'深さ時間':>9} {'ノード':>9} {'ノード/秒':>10} {'到達深さ':>8} {'手の一致':>8}")
+    total_base = total_other = 0.0
+    for base_row, other_row in zip(base, other):
+        base_depth, other_depth = base_row.get("fixed_depth", {}), other_row.get("fixed_depth", {})
+        base_time, other_time = base_row.get("fixed_time", {}), other_row.get("fixed_time", {})
+        total_base += base_depth.get("time", 0.0)
+        total_other += other_depth.get("time", 0.0)
+        depth_delta = "-"
+        if base_time.get("depth") is not None and other_time.get("depth") is not None:
+            depth_delta = f"{other_time['depth'] - base_time['depth']:+d}"
+        same_move = "○" if base_depth.get("move") == other_depth.get("move") else "×"
+        lines.append(f"{base_row['name']:<24} {percent(other_depth.get('time'), base_depth.get('time')):>9} "
+                     f"{percent(other_depth.get('nodes'), base_depth.get('nodes')):>9} "
+                     f"{percent(other_depth.get('nps'), base_depth.get('nps')):>10} "
+                     f"{depth_delta:>8} {same_move:>8}")
+    lines.append(f"合計の深さ時間: {percent(total_other, total_base)}")
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="局面集でAIの探索速度を計測する")
+    parser.add_argument("engine", nargs="?", default="main.py", help="AIファイル（ファイル[:属性=値,...]）")
+    parser.add_argument("--compare", help="比較するAIファイル（engineを基準に差分を表示）")
+    parser.add_argument("--depth", type=int, default=5, help="固定深さ計測の深さ（0で省略）")
+    parser.add_argument("--time", type=float, default=1.0, help="固定時間計測の持ち時間（0で省略）")
+    parser.add_argument("--phase", choices=["opening", "middlegame", "endgame"], help="この段階の局面だけ計測する")
+    parser.add_argument("--json", help="結果をJSONで保存するファイル")
+    parser.add_argument("--trace", help="固定時間計測の探索統計を書き出すJSON Linesファイル")
+    parser.add_argument("--extract", action="store_true", help="*.log から局面集を作り直して終了する")
+    args = parser.parse_args()
+
+    if args.extract:
+        log_paths = sorted(glob.glob("*.log") + glob.glob(os.path.join("*", "*.log")))
+        corpus = extract_corpus(log_paths)
+        with open(CORPUS_PATH, "w", encoding="utf-8") as file:
+            json.dump(corpus, file, ensure_ascii=False, indent=1)
+        print(f"{len(corpus)}局面を {CORPUS_PATH} に保存しました")
+        return
+
+    corpus = load_corpus()
+    if args.phase:
+        corpus = [entry for entry in corpus if entry["phase"] == args.phase]
+
+    report = {"corpus": len(corpus), "depth": args.depth, "time_limit": args.time, "engines": {}}
+    base = benchmark(args.engine, corpus, args.depth, args.time, bool(args.trace))
+    report["engines"][args.engine] = base
+    print(format_table(args.engine, base))
+
+    if args.compare:
+        other = benchmark(args.compare, corpus, args.depth, args.time, bool(args.trace))
+        report["engines"][args.compare] = other
+        print()
+        print(format_table(args.compare, other))
+        print()
+        print(format_comparison(args.engine, base, args.compare, other))
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as file:
+            json.dump(report, file, ensure_ascii=False, indent=1)
+
+    if args.trace:
+        with open(args.trace, "w", encoding="utf-8") as file:
+            for spec, rows in report["engines"].items():
+                for row in rows:
+                    search = row.get("fixed_time", {}).pop("search", None)
+                    if search is not None:
+                        record = {"engine": spec, "name": row["name"], "phase": row["phase"], **search}
+                        file.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+
+if __name__ == "__main__":
+    main()
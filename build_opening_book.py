@@ -0,0 +1,153 @@
+# === build_opening_book.py ===
+# 定跡データを事前計算して main.py の OPENING_BOOK_DATA に埋め込むスクリプト（ローカル専用）
+# 使い方: python build_opening_book.py --plies 4 --depth 8 --write
+#   --plies N : 石が0〜N-1個の局面（対称形は1つにまとめる）をすべて深く読む
+#   --depth D : 1局面あたりの探索深さ（反復深化で1..Dまで読む）
+#   --write   : 生成したデータで main.py を書き換える（指定しなければ表示だけ）
+import argparse
+import base64
+import re
+import sys
+import time
+import zlib
+
+import local_driver
+
+# main.py は本番用に framework から Alg3D を import するので、ローカルでは local_driver で代用する
+sys.modules.setdefault("framework", local_driver)
+
+BEGIN_MARKER = "# ===== OPENING_BOOK_DATA begin ====="
+END_MARKER = "# ===== OPENING_BOOK_DATA end ====="
+
+
+def bitboards_to_board(black_board: int, white_board: int) -> local_driver.Board:
+    """ビットボードを get_move に渡す3次元リストの盤面に戻す"""
+    board = local_driver.create_board()
+    for position in range(64):
+        z, y, x = position >> 4, (position >> 2) & 3, position & 3
+        if (black_board >> position) & 1:
+            board[z][y][x] = 1
+        elif (white_board >> position) & 1:
+            board[z][y][x] = 2
+    return board
+
+
+def enumerate_positions(ai, plies: int) -> list[tuple[int, int]]:
+    """
+    初期局面から plies 手未満で到達できる勝敗のついていない局面を、代表形だけ列挙する
+
+    Returns:
+        list: (代表形の黒, 代表形の白) のリスト（石数の少ない順）
+    """
+    level = [ai._canonical_position(0, 0)[0]]
+    positions = []
+
+    for ply in range(plies):
+        positions.extend(sorted(level))
+        if ply == plies - 1:
+            break
+
+        next_level = set()
+        for black_board, white_board in level:
+            player = 1 if ply % 2 == 0 else 2
+            playable = ai._get_playable_bb(black_board, white_board)
+            while playable:
+                bit = playable & -playable
+                playable ^= bit
+                if player == 1:
+                    new_black, new_white = black_board | bit, white_board
+                else:
+                    new_black, new_white = black_board, white_board | bit
+                if ai._check_win_at(new_black if player == 1 else new_white, bit.bit_length() - 1):
+                    continue
+                next_level.add(ai._canonical_position(new_black, new_white)[0])
+        level = next_level
+
+    return positions
+
+
+def search_best_column(ai, black_board: int, white_board: int, depth: int) -> int:
+    """代表形の局面を深さ1..depthの反復深化で読み、最善手の列番号(y * 4 + x)を返す"""
+    stones = bin(black_board | white_board).count("1")
+    player = 1 if stones % 2 == 0 else 2
+    board = bitboards_to_board(black_board, white_board)
+
+    ai.player_num = player
+    best_move = None
+    for current_depth in range(1, depth + 1):
+        _, move = ai.alpha_beta(board, current_depth, -float("inf"), float("inf"), True, player)
+        if move is not None:
+            best_move = move
+    return best_move[1] * 4 + best_move[0]
+
+
+def encode_book(entries: list[tuple[int, int, int]]) -> str:
+    """(黒, 白, 列番号) のリストを base64 + zlib の文字列にする"""
+    data = bytearray()
+    for black_board, white_board, column in sorted(entries):
+        data += black_board.to_bytes(8, "little")
+        data += white_board.to_bytes(8, "little")
+        data.append(column)
+    return base64.b64encode(zlib.compress(bytes(data), 9)).decode("ascii")
+
+
+def format_book_block(encoded: str, count: int, plies: int, depth: int) -> str:
+    """main.py に埋め込む OPENING_BOOK_DATA のブロックを作る（76文字ごとに改行）"""
+    lines = [
+        BEGIN_MARKER,
+        "# 定跡データ（build_opening_book.pyが生成。手で編集しないこと）",
+        f"# {count}局面 / 石{plies - 1}個まで / 探索深さ{depth}",
+        "# 1局面 = 代表形の黒ビットボード(8バイト) + 白ビットボード(8バイト) + 代表形での最善手の列番号(1バイト)",
+        "OPENING_BOOK_DATA = (",
+    ]
+    for start in range(0, len(encoded), 76):
+        lines.append(f'    "{encoded[start:start + 76]}"')
+    lines.append(")")
+    lines.append(END_MARKER)
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="定跡データを生成して main.py に埋め込む")
+    parser.add_argument("--engine", default="main.py", help="探索に使うAIファイル（書き換え先も兼ねる）")
+    parser.add_argument("--plies", type=int, default=4, help="石がこの数未満の局面を定跡にする")
+    parser.add_argument("--depth", type=int, default=8, help="1局面あたりの探索深さ")
+    parser.add_argument("--write", action="store_true", help="生成したデータで --engine のファイルを書き換える")
+    args = parser.parse_args()
+
+    ai = local_driver.load_ai(args.engine)
+    ai.use_opening_book = False  # 生成中は古い定跡を参照しない
+
+    positions = enumerate_positions(ai, args.plies)
+    print(f"定跡の対象局面: {len(positions)}")
+
+    entries = []
+    start_time = time.process_time()
+    for index, (black_board, white_board) in enumerate(positions, 1):
+        column = search_best_column(ai, black_board, white_board, args.depth)
+        entries.append((black_board, white_board, column))
+        if index % 10 == 0 or index == len(positions):
+            elapsed = time.process_time() - start_time
+            print(f"  {index}/{len(positions)} 局面 ({elapsed:.1f}秒)")
+
+    encoded = encode_book(entries)
+    block = format_book_block(encoded, len(entries), args.plies, args.depth)
+    print(f"定跡データ: {len(entries)}局面 / base64 {len(encoded)}文字")
+
+    if not args.write:
+        print(block)
+        return
+
+    with open(args.engine, encoding="utf-8") as file:
+        source = file.read()
+    pattern = re.compile(re.escape(BEGIN_MARKER) + ".*?" + re.escape(END_MARKER), re.DOTALL)
+    if not pattern.search(source):
+        raise SystemExit(f"{args.engine} に OPENING_BOOK_DATA のマーカーがありません")
+    source = pattern.sub(lambda _: block, source, count=1)
+    with open(args.engine, "w", encoding="utf-8") as file:
+        file.write(source)
+    print(f"{args.engine} を更新しました")
+
+
+if __name__ == "__main__":
+    main()
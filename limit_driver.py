@@ -0,0 +1,186 @@
+# === limit_driver.py ===
+# サーバの制限（1手あたりCPU約3秒・メモリ約1GB）を再現して get_move を呼ぶローカル専用ドライバ
+# 使い方:
+#   python limit_driver.py main.py                       # stub_board.py の局面で1手だけ制限付きで打つ
+#   python limit_driver.py main.py --cpu 3 --memory 1024 # 制限値を指定する（秒 / MB）
+#   python tournament.py main.py mainoriBB.py --limits   # 大会ランナーの全対局を制限付きにする
+# AIは子プロセスで動かし、着手のたびに resource.setrlimit で CPU時間を、起動時にアドレス空間を制限する
+# 制限を超えた・例外を出した手はサーバと同じく「異常終了」とし、次の手からは新しい子プロセスで続ける
+# （local_driver.py は変更禁止なので、制限付きの実行はこのファイルにまとめる）
+import argparse
+import json
+import math
+import os
+import select
+import subprocess
+import sys
+
+import local_driver
+
+try:
+    import resource
+except ImportError:  # Windowsにはresourceモジュールがない
+    resource = None
+
+# main.py は本番用に framework から Alg3D を import するので、ローカルでは local_driver で代用する
+sys.modules.setdefault("framework", local_driver)
+
+DEFAULT_CPU_LIMIT = 3.0  # 1手あたりのCPU時間（秒）
+DEFAULT_MEMORY_LIMIT_MB = 1024  # アドレス空間の上限（MB）
+
+
+class EngineCrash(RuntimeError):
+    """子プロセスのAIが例外・制限超過・強制終了で手を返せなかった"""
+
+
+# ===== 子プロセス側 =====
+
+def run_worker(config: dict):
+    """
+    子プロセスの本体。標準入力から1行1手のJSONを読み、結果を1行のJSONで返す
+    AIの print が通信を壊さないよう、AIから見える標準出力は標準エラーに付け替える
+    """
+    if resource is None:
+        raise SystemExit("この環境には resource モジュールがないため制限付きで実行できません")
+
+    channel = sys.stdout
+    sys.stdout = sys.stderr
+
+    memory_bytes = int(config["memory_limit_mb"] * 1024 * 1024)
+    _, hard = resource.getrlimit(resource.RLIMIT_AS)
+    resource.setrlimit(resource.RLIMIT_AS, (memory_bytes, hard))
+
+    ai = local_driver.load_ai(config["path"])
+    for key, value in config["attributes"].items():
+        setattr(ai, key, value)
+
+    for line in sys.stdin:
+        request = json.loads(line)
+
+        # RLIMIT_CPUはプロセスの累計なので、この手の分だけ上限を引き上げる（秒単位で切り上げ）
+        usage = resource.getrusage(resource.RUSAGE_SELF)
+        used = usage.ru_utime + usage.ru_stime
+        _, hard = resource.getrlimit(resource.RLIMIT_CPU)
+        resource.setrlimit(resource.RLIMIT_CPU, (int(math.ceil(used + config["cpu_limit"])), hard))
+
+        response = {"move": None, "invalid": None, "error": None}
+        try:
+            move = ai.get_move(request["board"], request["player"], tuple(request["last_move"]))
+            if isinstance(move, (tuple, list)) and len(move) == 2 and all(type(v) is int for v in move):
+                response["move"] = list(move)
+            else:
+                response["invalid"] = repr(move)
+        except BaseException as error:  # MemoryErrorも含めてサーバでは異常終了になる
+            response["error"] = f"{type(error).__name__}: {error}"
+
+        usage = resource.getrusage(resource.RUSAGE_SELF)
+        response["cpu"] = usage.ru_utime + usage.ru_stime - used
+        response["rss_mb"] = usage.ru_maxrss / 1024  # Linuxではキロバイト単位
+        stats = getattr(ai, "stats", None)  # collect_statsを有効にしたエンジンの探索統計
+        response["search"] = stats.to_dict() if hasattr(stats, "to_dict") else None
+        channel.write(json.dumps(response) + "\n")
+        channel.flush()
+
+
+# ===== 親プロセス側 =====
+
+class LimitedEngine:
+    """
+    子プロセスで動くAIを MyAI と同じ get_move で呼ぶためのラッパー
+    手を返せなかったときは EngineCrash を送出する（呼び出し側で強制配置にする）
+    last_stats には直前の手の {"cpu": 秒, "rss_mb": 最大RSS, "error": 理由, "search": 探索統計の辞書} が入る
+    """
+    def __init__(self, path: str, attributes: dict = None, cpu_limit: float = DEFAULT_CPU_LIMIT,
+                 memory_limit_mb: float = DEFAULT_MEMORY_LIMIT_MB):
+        self.config = {"path": os.path.abspath(path), "attributes": attributes or {},
+                       "cpu_limit": cpu_limit, "memory_limit_mb": memory_limit_mb}
+        self.cpu_limit = cpu_limit
+        self.process = None
+        self.last_stats = None
+        self.restarts = 0
+
+    def _start(self):
+        self.process = subprocess.Popen(
+            [sys.executable, os.path.abspath(__file__), "--worker", json.dumps(self.config)],
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True, encoding="utf-8",
+            cwd=os.path.dirname(self.config["path"]))
+
+    def _kill(self):
+        if self.process is not None:
+            self.process.kill()
+            self.process.wait()
+            self.process = None
+            self.restarts += 1
+
+    def get_move(self, board: local_driver.Board, player: int, last_move: tuple):
+        if self.process is None or self.process.poll() is not None:
+            self._start()
+
+        request = {"board": board, "player": player, "last_move": list(last_move)}
+        try:
+            self.process.stdin.write(json.dumps(request) + "\n")
+            self.process.stdin.flush()
+        except OSError:
+            return self._crash("子プロセスが終了していた", None)
+
+        # CPU制限はSIGXCPUで効くが、sleepなどで止まった場合に備えて実時間でも打ち切る
+        ready, _, _ = select.select([self.process.stdout], [], [], self.cpu_limit * 4 + 10)
+        line = self.process.stdout.readline() if ready else ""
+        if not line:
+            return_code = self.process.poll()
+            reason = "応答なし" if return_code is None else f"子プロセスが終了した (終了コード {return_code})"
+            return self._crash(reason, None)
+
+        response = json.loads(line)
+        if response["error"]:
+            return self._crash(response["error"], response)
+        if response["cpu"] > self.cpu_limit:
+            return self._crash(f"CPU時間超過 ({response['cpu']:.2f}秒)", response)
+
+        self.last_stats = {"cpu": response["cpu"], "rss_mb": response["rss_mb"], "error": None,
+                           "search": response["search"]}
+        return tuple(response["move"]) if response["move"] is not None else response["invalid"]
+
+    def _crash(self, reason: str, response):
+        """サーバではこの時点でプロセスごと終了するので、状態を捨てて次の手は作り直す"""
+        self._kill()
+        self.last_stats = {"cpu": response["cpu"] if response else self.cpu_limit,
+                           "rss_mb": response["rss_mb"] if response else None, "error": reason, "search": None}
+        raise EngineCrash(reason)
+
+    def close(self):
+        if self.process is not None:
+            self.process.stdin.close()
+            self.process.wait()
+            self.process = None
+
+
+def main():
+    if len(sys.argv) == 3 and sys.argv[1] == "--worker":
+        run_worker(json.loads(sys.argv[2]))
+        return
+
+    parser = argparse.ArgumentParser(description="サーバと同じCPU時間・メモリ制限で1手打つ")
+    parser.add_argument("engine", nargs="?", default="main.py", help="AIファイル")
+    parser.add_argument("--cpu", type=float, default=DEFAULT_CPU_LIMIT, help="1手あたりのCPU時間制限（秒）")
+    parser.add_argument("--memory", type=float, default=DEFAULT_MEMORY_LIMIT_MB, help="メモリ制限（MB）")
+    args = parser.parse_args()
+
+    engine = LimitedEngine(args.engine, cpu_limit=args.cpu, memory_limit_mb=args.memory)
+    try:
+        move = engine.get_move(local_driver.board, local_driver.player, local_driver.last_move)
+        if isinstance(move, tuple) and all(0 <= v < 4 for v in move) and local_driver.board[3][move[1]][move[0]] == 0:
+            print("AI の出力:", move)
+        else:
+            print(f"※無効座標を返したため強制配置になります: {move}")
+    except EngineCrash as crash:
+        print(f"※異常終了したため強制配置になります: {crash}")
+    finally:
+        engine.close()
+    stats = engine.last_stats
+    rss = "-" if stats["rss_mb"] is None else f"{stats['rss_mb']:.1f}MB"
+    print(f"CPU時間 {stats['cpu']:.3f}秒 / 最大RSS {rss}")
+
+
+if __name__ == "__main__":
+    main()
@@ -23,12 +23,16 @@
 # https://qiita.com/zawawahoge/items/8bbd4c2319e7f7746266 ビットカウント最高効率だヒャアッ！
 
 
-from typing import Optional, Dict
+from typing import Optional
 # from local_driver import Alg3D, Board # ローカル検証用
 from framework import Alg3D, Board # 本番用
+import base64
 import math
 import random
-from dataclasses import dataclass
+import time
+import zlib
+from array import array
+from operator import xor
 
 """
 高速ビットカウント関数
@@ -50,21 +54,440 @@ def popcount(x):
     x = x + (x >> 32) # 64bitごと = 全部の合計
     return x & 0x0000007f
 
+# ビットボードの定数（ビット位置 = z * 16 + y * 4 + x）
+FULL_BOARD = (1 << 64) - 1
+BOTTOM_LAYER = 0xFFFF  # z = 0 の16マス
+COLUMN_BITS = 0x0001000100010001  # (x, y) = (0, 0) の列（z = 0..3）
+ODD_LAYERS = 0x0000FFFF0000FFFF  # z = 0, 2（下から1, 3段目）: 重力下で先手(黒)に有利な段
+EVEN_LAYERS = 0xFFFF0000FFFF0000  # z = 1, 3（下から2, 4段目）: 後手(白)に有利な段
+
+# 置換表エントリの評価値タイプ（array('b')に格納する小さな整数）
+TT_EMPTY = 0  # 未使用スロット
+TT_EXACT = 1
+TT_LOWERBOUND = 2
+TT_UPPERBOUND = 3
+
+# ===== 静的な表（モジュールのimport時に1度だけ作り、全インスタンスで共有する） =====
+# サーバがAIを対局ごと・手ごとに作り直しても、MyAI()で表を作り直さずに済むようにタプルで持つ
+
+"""
+4つ並びの勝利パターン（76本）をビットマスクで生成
+13方向（X/Y/Z軸、各種対角線）は向きが重複しないので、始点と方向の組で各ラインはちょうど1回現れる
+"""
+def _generate_win_patterns() -> tuple[int, ...]:
+    directions = [
+        (1, 0, 0),   # X軸方向
+        (0, 1, 0),   # Y軸方向  
+        (0, 0, 1),   # Z軸方向
+        (1, 1, 0),   # XY平面の斜め
+        (1, -1, 0),
+        (1, 0, 1),   # XZ平面の斜め
+        (1, 0, -1),
+        (0, 1, 1),   # YZ平面の斜め
+        (0, 1, -1),
+        (1, 1, 1),   # 3D対角線
+        (1, 1, -1),
+        (1, -1, 1),
+        (-1, 1, 1)
+    ]
+    patterns = []
+    
+    for z in range(4):
+        for y in range(4):
+            for x in range(4):
+                for dx, dy, dz in directions:
+                    if not (0 <= x + 3 * dx < 4 and 0 <= y + 3 * dy < 4 and 0 <= z + 3 * dz < 4):
+                        continue
+                    pattern = 0
+                    for i in range(4):
+                        pattern |= 1 << ((z + i * dz) * 16 + (y + i * dy) * 4 + (x + i * dx))
+                    patterns.append(pattern)
+    
+    return tuple(patterns)
+
+"""
+勝利パターンを方向ごとにまとめ、(ビット間隔, 始点マスク) の表を作る
+どのラインも最下位ビットの始点pから p, p+d, p+2d, p+3d の4マスなので、
+盤面をd, 2d, 3dだけ右シフトしてANDすれば同じ方向の全ラインを一度に調べられる
+"""
+def _generate_line_directions(win_patterns: tuple[int, ...]) -> tuple[tuple[int, int], ...]:
+    starts = {}
+    for pattern in win_patterns:
+        low = pattern & -pattern
+        rest = pattern ^ low
+        step = (rest & -rest).bit_length() - low.bit_length()
+        starts[step] = starts.get(step, 0) | low
+    return tuple(sorted(starts.items()))
+
+"""
+ラインの状態（黒石数 + 5 * 白石数）ごとの評価値表を作る（黒から見た値）
+片方の石だけのラインを 3つ50点、2つ10点、1つ1点 で評価（_evaluate_threats_bbと同じ配点）
+"""
+def _generate_line_values() -> tuple[float, ...]:
+    weights = (0.0, 1.0, 10.0, 50.0, 0.0)  # 4つ揃いは勝敗判定で扱う
+    line_values = []
+    
+    for code in range(25):
+        black_count, white_count = code % 5, code // 5
+        if white_count == 0:
+            line_values.append(weights[black_count])
+        elif black_count == 0:
+            line_values.append(-weights[white_count])
+        else:
+            line_values.append(0.0)  # 両者の石が混在するラインは価値なし
+    
+    return tuple(line_values)
+
+"""
+ゾブリストハッシュの乱数表（64位置 × 2プレイヤー）
+専用のRandomを固定シードで使うので、グローバルのrandomの状態は変えない
+"""
+def _generate_zobrist_table() -> tuple[tuple[int, int], ...]:
+    rng = random.Random(42)  # 再現性のため固定シード使用
+    return tuple((rng.randint(0, (1 << 63) - 1), rng.randint(0, (1 << 63) - 1)) for _ in range(64))
+
+"""
+x/y平面の8通りの対称変換について、各マスの移動先ビット位置の表を作る
+0番は恒等変換（変換しない）
+"""
+def _generate_symmetry_positions() -> tuple[tuple[int, ...], ...]:
+    transforms = [
+        lambda x, y: (x, y),          # 恒等
+        lambda x, y: (3 - y, x),      # 90度回転
+        lambda x, y: (3 - x, 3 - y),  # 180度回転
+        lambda x, y: (y, 3 - x),      # 270度回転
+        lambda x, y: (3 - x, y),      # x反転
+        lambda x, y: (x, 3 - y),      # y反転
+        lambda x, y: (y, x),          # 主対角線で反転
+        lambda x, y: (3 - y, 3 - x),  # 副対角線で反転
+    ]
+    
+    symmetry_positions = []
+    for transform in transforms:
+        positions = []
+        for position in range(64):
+            z, y, x = position >> 4, (position >> 2) & 3, position & 3
+            new_x, new_y = transform(x, y)
+            positions.append(z * 16 + new_y * 4 + new_x)
+        symmetry_positions.append(tuple(positions))
+    
+    return tuple(symmetry_positions)
+
+WIN_PATTERNS = _generate_win_patterns()
+# マスごとに、そのマスを通る勝利パターン（4〜7本）とその索引
+CELL_LINES = tuple(tuple(pattern for pattern in WIN_PATTERNS if (pattern >> position) & 1)
+                   for position in range(64))
+CELL_LINE_IDS = tuple(tuple(index for index, pattern in enumerate(WIN_PATTERNS) if (pattern >> position) & 1)
+                      for position in range(64))
+LINE_DIRECTIONS = _generate_line_directions(WIN_PATTERNS)
+LINE_VALUES = _generate_line_values()
+# LINE_DELTAS[プレイヤー][状態] = そのプレイヤーが石を1つ足したときの評価値の変化（0番は未使用）
+LINE_DELTAS = (None,
+               tuple(LINE_VALUES[min(code + 1, 24)] - LINE_VALUES[code] for code in range(25)),
+               tuple(LINE_VALUES[min(code + 5, 24)] - LINE_VALUES[code] for code in range(25)))
+# 列番号(y * 4 + x)ごとの列マスクと、ビット位置から(x, y)への変換表
+COLUMN_MASKS = tuple(COLUMN_BITS << column for column in range(16))
+POSITION_MOVES = tuple((position & 3, (position >> 2) & 3) for position in range(64))
+ZOBRIST_TABLE = _generate_zobrist_table()
+SYMMETRY_POSITIONS = _generate_symmetry_positions()
+SYMMETRY_COLUMNS = tuple(positions[:16] for positions in SYMMETRY_POSITIONS)
+SYMMETRY_COLUMNS_INVERSE = tuple(tuple(columns.index(column) for column in range(16))
+                                 for columns in SYMMETRY_COLUMNS)
+# SYMMETRY_ZOBRIST[位置][プレイヤー] = 8通りの対称形それぞれでXORする値
+SYMMETRY_ZOBRIST = tuple(tuple(tuple(ZOBRIST_TABLE[positions[position]][player] for positions in SYMMETRY_POSITIONS)
+                               for player in range(2))
+                         for position in range(64))
+
+"""
+固定サイズの置換表（Transposition Table）
+エントリをオブジェクトではなく列ごとの配列(array)に格納し、メモリ量を一定に保つ
+- keys: ゾブリストハッシュ値（ハッシュ衝突検出用）
+- depths: この評価値を計算した際の探索深度
+- scores: 盤面の評価値（整数）
+- flags: 評価値のタイプ（TT_EXACT, TT_LOWERBOUND, TT_UPPERBOUND）
+- moves: この盤面での最善手（y * 4 + x にパック、-1は手なし）
+- ages: 保存した時点の世代番号（get_moveごとに進め、古い世代のエントリから置き換える）
+hash & mask で選ぶ2スロットのバケット構成:
+スロット0は深さ優先で置換（古い世代なら深さに関係なく置換）、スロット1は常に上書き
+"""
+class TranspositionTable:
+    
+    def __init__(self, capacity: int):
+        # capacityは2のべき乗のエントリ数（2スロット/バケット）
+        self.capacity = capacity
+        self.mask = (capacity >> 1) - 1
+        self.keys = array('q', [0]) * capacity
+        self.depths = array('b', [0]) * capacity
+        self.scores = array('q', [0]) * capacity
+        self.flags = array('b', [0]) * capacity
+        self.moves = array('b', [0]) * capacity
+        self.ages = array('b', [0]) * capacity
+        self.generation = 0
+    
+    """
+    ハッシュ値に一致するスロット番号を返す（見つからなければ-1）
+    """
+    def probe(self, hash_key: int) -> int:
+        index = (hash_key & self.mask) << 1
+        if self.flags[index] and self.keys[index] == hash_key:
+            return index
+        index += 1
+        if self.flags[index] and self.keys[index] == hash_key:
+            return index
+        return -1
+    
+    """
+    エントリを保存する
+    同じ局面か、より深い探索結果か、スロット0が古い世代ならスロット0、そうでなければスロット1を上書き
+    """
+    def store(self, hash_key: int, depth: int, score: int, flag: int, move: int):
+        index = (hash_key & self.mask) << 1
+        if (self.flags[index] and self.keys[index] != hash_key
+                and self.ages[index] == self.generation and depth < self.depths[index]):
+            index += 1
+        self.keys[index] = hash_key
+        self.depths[index] = depth
+        self.scores[index] = score
+        self.flags[index] = flag
+        self.moves[index] = move
+        self.ages[index] = self.generation
+    
+    """
+    storeが書き込むスロット番号（storeと同じ規則。統計で別局面の上書きを数えるために使う）
+    """
+    def replacement_slot(self, hash_key: int, depth: int) -> int:
+        index = (hash_key & self.mask) << 1
+        if (self.flags[index] and self.keys[index] != hash_key
+                and self.ages[index] == self.generation and depth < self.depths[index]):
+            index += 1
+        return index
+    
+    """
+    世代を1つ進める（以降、それまでのエントリは置き換えの優先対象になる）
+    """
+    def new_generation(self):
+        self.generation = (self.generation + 1) & 127
+    
+    """
+    全エントリを未使用に戻す
+    """
+    def clear(self):
+        self.flags = array('b', [0]) * self.capacity
+
+# ===== OPENING_BOOK_DATA begin =====
+# 定跡データ（build_opening_book.pyが生成。手で編集しないこと）
+# 361局面 / 石3個まで / 探索深さ8
+# 1局面 = 代表形の黒ビットボード(8バイト) + 白ビットボード(8バイト) + 代表形での最善手の列番号(1バイト)
+OPENING_BOOK_DATA = (
+    "eNplmE2ynDoMhfkzMYQKFMWAoaEYsAwvgSX0UryEXnJuqtFx8+VNbuc8WTo6kmXjosB/Jf49GlDd"
+    "fwcDGgL+/usMCAQinab7b62wt9degKdF+o/p59dYgfpQwVIWDS08LSYjViEXWUT6MF5SyuLKh/0f"
+    "LTEiGfD0MSGsiAi4ibgKAmWnt62rkX5bI+pQM/0aUQVEAomA0q+RfgZuIl2N9Psa6eclgUAkkAjc"
+    "RL6AD5HaQUrnoEfrqIeDHoOjHo56OOrhoEfvoEe28AQmAoFAJJAImB4Z+MStW+yXoUX6ArSzWybX"
+    "IrmxBfWiZSe3qEvVceR0cOE6uCg78Og68MgWtqM68Og7CFTN0KOduYFmNEw3U6AZ/VHMHBczqi+n"
+    "8jqzlDMUKxZOuoUSLtzqC5ku7OQFTLVExV7YyQs7eeHOXliGBWUQD3XywsG2sHEzcHtdoYdbudVX"
+    "lHJcOehXHlor9VjZdCv0UBTVdqUeK5jnJYFABA8j8kfA7TUTM6+Bp3qgQDxWBDTcrp6ACdQGjr7A"
+    "Uz0gfUVRa2emn1/1RmIbK7fxEN/YyRuIyULENhAbNjbdhungNjAdd2q6g2m3c1zsGGzFDuqySATU"
+    "dDuP151NtyO5vMQ24c6a7mi6vMT02DmDduhRHDxODpbyYOUO6NEdLOXBUh4cSgeH0sGhdPB4PXhG"
+    "HUhF1LUJDzbuwaF0UI+T/XFySJ9s7ZN6nNxzJ4+Tk/1x8kQ+ef06eeCc7I+TepzU42R/nBhK2ak5"
+    "uajHxf64eN5ebJiL97GLQ/qCHr8u6NFd0ENhtV8u6JF9BC6JDGv9cWEmtxn4rBle0KN5QQ8Buo+9"
+    "kNz4YnIvlvIF6nJqSPNmXd7s0zfvDm/w6N8cSm/yePMG+6ZATYlLjQH586lEOxggYgZovxiQ6MOq"
+    "Lx/mNQP3mr7B12rvwdR5MB0N0JenAboVe1AvPKjLh1FXWO1sz1w8clFYXTc8PtazRWSURMCuGx6f"
+    "4kOEHnWEHrJoaKHbRYRAslBtI/SQhZo/Uo9IPSL0yBaBPiKjmB4CzCRSj8T+SNQjQY8xQY82QY8+"
+    "sWESez3hzaT2FU5kAyoCDQGFNSDQQmE93l1kYU46j/eOvOSmMsSKHUSmEUxHA6RYJNOIN5POT5gw"
+    "BlTKdnpGcR43ai2JBIxJV9r3ZH4wK/mCVj7nmAFfL2jlU2QDEgG9KQm4vf4WkB+Iykf6ZQPAeQKB"
+    "QAQwJgC9TVg1nU021dY6t8x6VA/Fuur+KaYG6GZggOeSKTdW9dwvBsT81lc9B0pVPNtQTnWsCWho"
+    "4RHl6yXv2ZeDgEjACtVAj5+6PIFhAvDjHEsilyQu+afq49AqKiwpGtSl8LSYELYIjBLpIwEob2VC"
+    "LsMT+NEDgCcQ7p9fjRv4fRueO9sATyASSAS+vm/Ds/oCksoQMLUJFM0T6AuP5IoEoFSmX0/hD1WD"
+    "zO9FfwHYVWEc"
+)
+# ===== OPENING_BOOK_DATA end =====
+
+"""
+探索の持ち時間（CPU時間）を使い切ったことを通知する例外
+反復深化の途中で投げられ、get_moveで捕まえて直前の反復結果を採用する
+"""
+class SearchTimeout(Exception):
+    pass
+
+"""
+1手分の探索統計（collect_statsがTrueのときだけget_moveごとに作り、MyAI.statsに置く）
+エンジンはファイルに書けないので、JSONへの書き出しはローカルツール側でto_dict()を使って行う
+- source: 手を決めた処理（"book", "forced", "endgame", "alphabeta", "mcts", "fallback"）
+- iterations: 反復深化の各反復の (深さ, ノード数, CPU秒, 評価値, 最善手, 窓から外れた再探索の回数)
+- cutoffs: βカットを起こした手の並び順の位置ごとの回数（0番目が最初に試した手）
+- tt_probes / tt_hits / tt_stores / tt_collisions: 置換表の参照・利用・保存・別局面の上書き回数
+"""
+class SearchStats:
+    
+    def __init__(self):
+        self.source = None
+        self.move = None
+        self.time = 0.0
+        self.nodes = 0
+        self.completed_depth = 0
+        self.iterations = []
+        self.researches = 0
+        self.cutoffs = [0] * 16
+        self.tt_probes = 0
+        self.tt_hits = 0
+        self.tt_stores = 0
+        self.tt_collisions = 0
+        self.principal_variation = []
+    
+    """
+    最後の2反復のノード数の比（実効分岐係数）。反復が1つ以下ならNone
+    """
+    def effective_branching_factor(self) -> Optional[float]:
+        if len(self.iterations) < 2 or not self.iterations[-2][1]:
+            return None
+        return self.iterations[-1][1] / self.iterations[-2][1]
+    
+    """
+    βカットのうち最初に試した手で起きた割合（手の並び替えの良さの目安）
+    """
+    def first_move_cutoff_rate(self) -> Optional[float]:
+        total = sum(self.cutoffs)
+        return self.cutoffs[0] / total if total else None
+    
+    """
+    JSONにそのまま書ける辞書にする
+    """
+    def to_dict(self) -> dict:
+        return {
+            "source": self.source,
+            "move": list(self.move) if self.move is not None else None,
+            "time": self.time,
+            "nodes": self.nodes,
+            "completed_depth": self.completed_depth,
+            "iterations": [{"depth": depth, "nodes": nodes, "time": elapsed, "score": score,
+                            "move": list(move) if move is not None else None, "researches": researches}
+                           for depth, nodes, elapsed, score, move, researches in self.iterations],
+            "researches": self.researches,
+            "effective_branching_factor": self.effective_branching_factor(),
+            "cutoffs": self.cutoffs,
+            "first_move_cutoff_rate": self.first_move_cutoff_rate(),
+            "tt": {"probes": self.tt_probes, "hits": self.tt_hits,
+                   "stores": self.tt_stores, "collisions": self.tt_collisions},
+            "principal_variation": [list(move) for move in self.principal_variation],
+        }
+
 """
-置換表（Transposition Table）のエントリを表すクラス
-- hash_key: ゾブリストハッシュ値（ハッシュ衝突検出用）
-- depth: この評価値を計算した際の探索深度
-- score: 盤面の評価値
-- flag: 評価値のタイプ（EXACT, LOWERBOUND, UPPERBOUND）
-- best_move: この盤面での最善手
+αβ探索中の局面（1手打つごとに子ノードの盤面を作らず、同じオブジェクトを書き換えて戻す）
+黒・白のビットボード、手番、ゾブリストハッシュ、各列の石数（次に石が入る段）と、
+着手ごとに差分更新するライン集計・評価値（黒から見た値）・8通りの対称ハッシュ・脅威マップを持つ
+make(column)は手番側の石をその列に落とし、unmake()で1手戻す
+戻すための値は手数(ply)ごとに確保済みの枠に書くので、1手ごとに新しいタプルやリストを作らない
+全体の作り直しはルートでMyAI._init_search_stateが行う
 """
-@dataclass
-class TranspositionEntry:
-    hash_key: int
-    depth: int 
-    score: float
-    flag: str  # "EXACT", "LOWERBOUND", "UPPERBOUND"
-    best_move: Optional[tuple[int, int]]
+class SearchState:
+    __slots__ = ("black", "white", "player", "hash_key", "heights", "ply", "moves", 
+                 "line_counts", "line_score", "symmetry_hashes", "use_symmetry", "threat_cells", 
+                 "saved_scores", "saved_black_threats", "saved_white_threats", "symmetry_stack")
+    
+    def __init__(self):
+        self.black = 0
+        self.white = 0
+        self.player = 1  # 手番（1:黒, 2:白）
+        self.hash_key = 0
+        self.heights = [0] * 16  # 列(y * 4 + x)ごとの石数
+        self.ply = 0  # ルートから打った手数
+        self.moves = [0] * 64  # 手数ごとの打ったマス（ビット位置）
+        self.line_counts = [0] * len(WIN_PATTERNS)  # ラインごとの 黒石数 + 5 * 白石数
+        self.line_score = 0.0
+        self.use_symmetry = True  # Falseなら対称ハッシュを更新しない
+        # 手数ごとの8通りの対称ハッシュ（symmetry_hashesは現在の手数の枠を指す）
+        self.symmetry_stack = [[0] * 8 for _ in range(65)]
+        self.symmetry_hashes = self.symmetry_stack[0]
+        # 脅威マップ（そこに打てば4つ揃う空きマスの集合、プレイヤー番号で引く）
+        self.threat_cells = [0, 0, 0]
+        # 手数ごとの打つ前の評価値と黒・白の脅威マップ（盤面とハッシュ値はXORで戻せるので持たない）
+        self.saved_scores = [0.0] * 64
+        self.saved_black_threats = [0] * 64
+        self.saved_white_threats = [0] * 64
+    
+    """
+    手番側の石をcolumn(y * 4 + x)に落とす（置けるかどうかは呼び出し側が着手可能マスで確認済み）
+    update_threatsがFalseなら脅威マップは更新しない（脅威マップを使わない浅いノード用）
+    """
+    def make(self, column: int, update_threats: bool):
+        player = self.player
+        ply = self.ply
+        heights = self.heights
+        position = (heights[column] << 4) | column
+        bit = 1 << position
+        heights[column] += 1
+        self.moves[ply] = position
+        self.saved_scores[ply] = line_score = self.line_score
+        threat_cells = self.threat_cells
+        self.saved_black_threats[ply] = threat_cells[1]
+        self.saved_white_threats[ply] = threat_cells[2]
+        self.ply = ply + 1
+        
+        # 打った1マス分のゾブリスト値をXORするだけで新しいハッシュ値になる
+        self.hash_key ^= ZOBRIST_TABLE[position][player - 1]
+        if self.use_symmetry:
+            hashes = self.symmetry_stack[ply + 1]
+            hashes[:] = map(xor, self.symmetry_hashes, SYMMETRY_ZOBRIST[position][player - 1])
+            self.symmetry_hashes = hashes
+        
+        if player == 1:
+            my_board = self.black = self.black | bit
+            opp_board = self.white
+            self.player = 2
+            increment = 1
+        else:
+            my_board = self.white = self.white | bit
+            opp_board = self.black
+            self.player = 1
+            increment = 5
+        
+        # 打ったマスを通るラインだけ集計と評価値を更新する
+        deltas = LINE_DELTAS[player]
+        counts = self.line_counts
+        for index in CELL_LINE_IDS[position]:
+            code = counts[index]
+            line_score += deltas[code]
+            counts[index] = code + increment
+        self.line_score = line_score
+        
+        if update_threats:
+            # 打ったマスは誰の脅威マスでもなくなり、打った側にはそのマスを通るラインの脅威だけが増える
+            new_threats = 0
+            for pattern in CELL_LINES[position]:
+                if not (opp_board & pattern):
+                    rest = pattern & ~my_board
+                    if rest and not (rest & (rest - 1)):
+                        new_threats |= rest
+            threat_cells[player] = (threat_cells[player] & ~bit) | new_threats
+            threat_cells[3 - player] &= ~bit
+    
+    """
+    直前のmakeを取り消す
+    """
+    def unmake(self):
+        ply = self.ply - 1
+        self.ply = ply
+        position = self.moves[ply]
+        bit = 1 << position
+        self.heights[position & 15] -= 1
+        self.line_score = self.saved_scores[ply]
+        threat_cells = self.threat_cells
+        threat_cells[1] = self.saved_black_threats[ply]
+        threat_cells[2] = self.saved_white_threats[ply]
+        self.symmetry_hashes = self.symmetry_stack[ply]
+        
+        player = 3 - self.player
+        self.player = player
+        self.hash_key ^= ZOBRIST_TABLE[position][player - 1]
+        if player == 1:
+            self.black ^= bit
+            increment = 1
+        else:
+            self.white ^= bit
+            increment = 5
+        counts = self.line_counts
+        for index in CELL_LINE_IDS[position]:
+            counts[index] -= increment
 
 """
 立体四目並べAI - Bitboard + 置換表 + ゾブリストハッシュ + 高速ビットカウント実装
@@ -76,39 +499,156 @@ class MyAI(Alg3D):
     AIの初期化 - 各種データ構造とハッシュテーブルの準備
     """
     def __init__(self):
-        self.max_depth = 4  # 探索深度
+        self.max_depth = 64  # 反復深化の最大深度（空きマス数でさらに制限）
         self.player_num = None  # 自分のプレイヤー番号
         
-        # 勝利パターンを事前計算（ビットマスク）
-        self.win_patterns = self._generate_win_patterns()
+        # 反復深化の持ち時間（サーバはCPU時間 約3秒で打ち切るため余裕を残す）
+        self.time_limit = 2.5  # 1手あたりのCPU秒
+        self.move_start_time = 0.0  # get_moveが呼ばれたprocess_timeの時刻
+        self.deadline = 0.0  # 探索を打ち切るprocess_timeの時刻
+        self.nodes = 0  # 探索ノード数（時間チェック用）
+        self.completed_depth = 0  # 直前の反復深化で最後まで読み切った深さ（ベンチマーク用）
+        
+        # 探索統計（Trueにするとget_moveごとにself.statsへSearchStatsを作る。Falseなら計測しない）
+        self.collect_stats = False
+        self.stats = None
+        
+        # 静的な表はimport時に作ったモジュール定数を共有する（インスタンスごとに作り直さない）
+        self.win_patterns = WIN_PATTERNS
+        self.cell_lines = CELL_LINES
+        
+        # ライン単位の差分評価（黒石数 + 5 * 白石数 でラインの状態を表す）
+        self.line_values = LINE_VALUES
+        # αβ探索中の局面（盤面・ハッシュ・ライン集計・脅威マップをmake/unmakeで差分更新）
+        self.search_state = SearchState()
+        
+        # 13方向それぞれの (ビット間隔, ラインの始点マスク)（ビットシフトで全ラインを一度に調べる用）
+        self.line_directions = LINE_DIRECTIONS
+        
+        # 評価モード: "count"は石数だけ、"parity"は脅威マスの打てる時期（重力と段の偶奇）も評価
+        self.eval_mode = "count"
+        # parityモードの配点: (すぐ打てる脅威, 有利な段の脅威, 不利な段の脅威, 死んだ脅威)
+        self.parity_weights = (30.0, 30.0, 10.0, -20.0)
+        
+        self.column_masks = COLUMN_MASKS
+        self.position_moves = POSITION_MOVES
+        self.zobrist_table = ZOBRIST_TABLE
+        
+        # 対称性の正規化: x/y平面の8通りの対称変換（回転・反転）でマスを写す表
+        # 重力はz方向だけに働くので、各層を同じように変換した盤面は同じ価値を持つ
+        self.use_symmetry = True  # 置換表のキーを8通りの対称形の代表（最小ハッシュ）にする
+        self.symmetry_positions = SYMMETRY_POSITIONS
+        self.symmetry_columns = SYMMETRY_COLUMNS
+        self.symmetry_columns_inverse = SYMMETRY_COLUMNS_INVERSE
+        self.symmetry_zobrist = SYMMETRY_ZOBRIST
+        
+        # 定跡（OPENING_BOOK_DATAを最初に使うときに展開する）
+        self.use_opening_book = True
+        self.opening_book: Optional[dict[tuple[int, int], int]] = None
+        self.out_of_book = False  # この対局で定跡から外れたか（盤面が前回から続いている間だけ保つ）
+        
+        # 置換表の初期化（固定サイズの配列なのでメモリ量は一定）
+        self.max_table_size = 1 << 20  # 約100万エントリ（約19MB、2のべき乗）
+        self.transposition_table = TranspositionTable(self.max_table_size)
         
-        # ゾブリストハッシュテーブルの初期化
-        self.zobrist_table = self._initialize_zobrist_table()
+        # 脅威手順ソルバー（連続した三目の脅威による必勝手順と、相手のそれに対する受けを探す）
+        self.threat_search_depth = 8  # 攻め手の手数の上限
+        self.threat_time_ratio = 0.2  # 持ち時間のうちソルバーに使う割合
+        self.root_moves = FULL_BOARD  # ルートで探索する着手可能マス（ソルバーが危険手を除外する）
+        # 探索中の脅威マップによる枝刈り（即勝ち・唯一の受け・相手の脅威マスの真下を避ける）を使う残り深さの下限
+        # （大きな値にすると枝刈りしない。脅威マップはこの深さ以上のノードでだけ差分更新する）
+        self.threat_pruning_depth = 1
         
-        # 置換表の初期化（メモリ制限対応）
-        self.max_table_size = 1000000  # 最大100万エントリ（約100MB）
-        self.transposition_table: Dict[int, TranspositionEntry] = {}
+        # 終盤の完全読み（空きマスが少なくなったら勝ち/引き分け/負けを読み切る）
+        self.endgame_empty_cells = 20  # 空きマスがこの数以下で完全読みを試す
+        self.endgame_time_ratio = 0.5  # 持ち時間のうち完全読みに使う割合（時間切れなら通常探索）
+        self.endgame_table_size = 1 << 18  # 完全読み専用の小さな置換表のエントリ数（2のべき乗）
+        self.endgame_table = TranspositionTable(self.endgame_table_size)
+        
+        # 探索エンジンの選択: "alphabeta"（反復深化PVS）または "mcts"（モンテカルロ木探索）
+        self.search_backend = "alphabeta"
+        
+        # ルートの探索窓の決め方: "full"（毎回全幅）, "aspiration"（前回の評価値±幅から広げていく）,
+        # "mtdf"（nullウィンドウ探索の繰り返しで評価値を挟み込む）
+        self.root_driver = "full"
+        self.aspiration_window = 50.0  # aspirationの初期の窓の半幅（失敗するたびに4倍に広げる）
+        self.last_root_score: Optional[float] = None  # 前の手番の最後の反復の評価値（窓の中心に使う）
+        # 互換用alpha_betaの前回の評価値（ベンチマークなどが深さを変えて呼ぶときの窓の中心。get_moveとは共有しない）
+        self.alpha_beta_root_score: Optional[float] = None
+        self.root_researches = 0  # 窓から外れてルートを探索し直した回数（直前のget_move / alpha_beta）
+        
+        # MCTSのノードプール（ノードごとのオブジェクトを作らず、列ごとの配列に格納する）
+        # 配列は初めてMCTSを使うときに_mcts_allocateで確保する
+        self.mcts_capacity = 1 << 18  # 最大ノード数
+        self.mcts_exploration = 1.4  # UCTの探索係数
+        self.mcts_random = random.Random(12345)  # プレイアウト用（グローバルのrandomを乱さない）
+        self.mcts_node_count = 0
+        self.mcts_visits = None
+        
+        # 手の並び替え用のキラー手（深さ(ply)ごとに2手）とヒストリー表（手番 × 16列）
+        self.search_depth = 0  # 現在の反復の深さ（ply = search_depth - depth）
+        self.killer_moves = [[-1, -1] for _ in range(65)]
+        self.history = [None, [0] * 16, [0] * 16]  # プレイヤー番号で引けるように0番は未使用
+        
+        # 手番をまたいで引き継ぐ探索状態（同じ対局の間は置換表・ヒストリー・読み筋を再利用）
+        self.principal_variation: list[tuple[int, int]] = []  # 直前の探索の読み筋（自分の手から）
+        self.pv_hint = -1  # 読み筋どおりに進んだときのルートの予想手（列番号）
+        self.last_stone_count = -1  # 前回のget_move時点の石数（新しい対局の検出用）
+        # 盤面の差分同期: 自分の手を打った直後の (黒, 白)。次のget_moveでは相手の手(last_move)だけ足す
+        self.synced_board: Optional[tuple[int, int]] = None
+        # この対局の棋譜（着手したマスのビット位置を初手から順に）。途中の局面から呼ばれて分からなければNone
+        self.game_moves: Optional[list[int]] = None
         
         # 統計情報（デバッグ用）
         self.tt_hits = 0
         self.tt_queries = 0
         
+        # Trueにすると差分更新したハッシュ値を毎ノード全計算と突き合わせて検証する（低速）
+        self.debug_hash = False
+        # Trueにすると差分評価値を毎葉ノード全パターン走査と突き合わせて検証する（低速）
+        self.debug_eval = False
+        # Trueにすると差分更新した脅威マップを毎ノード全計算と突き合わせて検証する（低速）
+        self.debug_threats = False
+        # Trueにすると差分同期した盤面をget_moveごとに全マスの変換と突き合わせて検証する
+        self.debug_sync = False
+        
     """
-    ゾブリストハッシュテーブルを初期化
-    64位置 × 2プレイヤー分のランダム値を生成
+    ビットボードを対称変換する（positionsはSYMMETRY_POSITIONSの1変換分）
     """
-    def _initialize_zobrist_table(self) -> list[list[int]]:
-        random.seed(42)  # 再現性のため固定シード使用
-        zobrist_table = []
-        
-        for position in range(64):  # 4x4x4 = 64位置
-            player_values = []
-            for player in range(2):  # プレイヤー0（黒）、プレイヤー1（白）
-                random_value = random.randint(0, (1 << 63) - 1)
-                player_values.append(random_value)
-            zobrist_table.append(player_values)
-        
-        return zobrist_table
+    def _transform_board(self, board: int, positions: list[int]) -> int:
+        result = 0
+        while board:
+            bit = board & -board
+            result |= 1 << positions[bit.bit_length() - 1]
+            board ^= bit
+        return result
+    
+    """
+    8通りの対称形のうち (黒, 白) が最小になるものを代表形として返す
+    戻り値: ((代表形の黒, 代表形の白), 代表形への変換番号)
+    """
+    def _canonical_position(self, black_board: int, white_board: int) -> tuple[tuple[int, int], int]:
+        best_key = (black_board, white_board)
+        best_symmetry = 0
+        for symmetry in range(1, 8):
+            positions = self.symmetry_positions[symmetry]
+            key = (self._transform_board(black_board, positions), self._transform_board(white_board, positions))
+            if key < best_key:
+                best_key = key
+                best_symmetry = symmetry
+        return best_key, best_symmetry
+    
+    """
+    8通りの対称形それぞれのゾブリストハッシュ値を全計算する（探索のルート用）
+    """
+    def _compute_symmetry_hashes(self, black_board: int, white_board: int) -> list[int]:
+        hashes = [0] * 8
+        for player, board in ((0, black_board), (1, white_board)):
+            while board:
+                position = (board & -board).bit_length() - 1
+                hashes = [h ^ z for h, z in zip(hashes, self.symmetry_zobrist[position][player])]
+                board &= board - 1
+        return hashes
     
     """
     ビットボードからゾブリストハッシュ値を計算
@@ -133,78 +673,150 @@ class MyAI(Alg3D):
             
         return hash_value
     
-    """
-    置換表のサイズ管理（メモリ制限対応）
-    テーブルサイズが上限を超えた場合、古いエントリを削除
-    """
-    def _manage_table_size(self):
-        if len(self.transposition_table) > self.max_table_size:
-            # テーブルサイズを半分にする（簡単な実装）
-            items = list(self.transposition_table.items())
-            keep_count = len(items) // 2
-            self.transposition_table = dict(items[:keep_count])
-    
     """
     置換表から過去の探索結果を検索
     同じ盤面があれば再計算をスキップし、Alpha-Betaウィンドウとの整合性をチェック
     """
-    def _lookup_transposition_table(self, hash_key: int, depth: int, alpha: float, beta: float) -> tuple[bool, float, Optional[tuple[int, int]]]:
+    def _lookup_transposition_table(self, hash_key: int, depth: int, alpha: float, beta: float, 
+                                   symmetry: int = 0) -> tuple[bool, float, Optional[tuple[int, int]]]:
         self.tt_queries += 1
         
-        if hash_key not in self.transposition_table:
+        # ハッシュ値の一致するスロットを探す（キー全体を比較するので衝突も検出される）
+        table = self.transposition_table
+        index = table.probe(hash_key)
+        if index < 0:
             return False, 0.0, None
         
-        entry = self.transposition_table[hash_key]
+        # 最善手は代表形の座標で保存されているので、現局面の座標に戻す
+        packed_move = table.moves[index]
+        if packed_move >= 0 and symmetry:
+            packed_move = self.symmetry_columns_inverse[symmetry][packed_move]
+        best_move = (packed_move & 3, packed_move >> 2) if packed_move >= 0 else None
         
-        # ハッシュ衝突検証
-        if entry.hash_key != hash_key:
-            return False, 0.0, None
-        
-        # 探索深度が不十分な場合は使用しない
-        if entry.depth < depth:
-            return False, 0.0, None
+        # 探索深度が不十分な場合は使用しない（best_moveの情報は有用）
+        if table.depths[index] < depth:
+            return False, 0.0, best_move
         
         # 評価値タイプに応じた利用可能性判定
-        if entry.flag == "EXACT":
+        flag = table.flags[index]
+        score = table.scores[index]
+        if flag == TT_EXACT:
             self.tt_hits += 1
-            return True, entry.score, entry.best_move
-        elif entry.flag == "LOWERBOUND" and entry.score >= beta:
+            return True, score, best_move
+        elif flag == TT_LOWERBOUND and score >= beta:
             self.tt_hits += 1
-            return True, entry.score, entry.best_move
-        elif entry.flag == "UPPERBOUND" and entry.score <= alpha:
+            return True, score, best_move
+        elif flag == TT_UPPERBOUND and score <= alpha:
             self.tt_hits += 1
-            return True, entry.score, entry.best_move
+            return True, score, best_move
         
         # 使用できないが、best_moveの情報は有用
-        return False, 0.0, entry.best_move
+        return False, 0.0, best_move
+    
+    """
+    get_moveごとの探索状態の引き継ぎ
+    前回の自分の手番から盤面が続いていなければ（continuedがFalse）、石数が前回より増えていないときに
+    新しい対局とみなして全状態を破棄する。同じ対局なら置換表の世代を進め、
+    棋譜の直近2手（自分の前回の手と相手の手）が読み筋どおりならルートの予想手を用意する
+    """
+    def _prepare_search_state(self, black_board: int, white_board: int, continued: bool):
+        stone_count = popcount(black_board | white_board)
+        # 置換表の大きさはインスタンス生成後に属性で変えられるので、食い違っていれば作り直す
+        if self.transposition_table.capacity != self.max_table_size:
+            self.transposition_table = TranspositionTable(self.max_table_size)
+        if self.endgame_table.capacity != self.endgame_table_size:
+            self.endgame_table = TranspositionTable(self.endgame_table_size)
+        if not continued:
+            self.out_of_book = False  # 棋譜が途切れたので定跡から外れたかどうかも分からない
+        if not continued and stone_count <= self.last_stone_count:
+            # 新しい対局: 前の対局の情報は役に立たないので捨てる
+            self.transposition_table.clear()
+            self.endgame_table.clear()
+            self.history = [None, [0] * 16, [0] * 16]
+            self.principal_variation = []
+            self.last_root_score = None
+        self.last_stone_count = stone_count
+        self.transposition_table.new_generation()
+        
+        # 読み筋の1手目（自分の前回の手）と2手目（相手の予想手）が棋譜と一致すれば3手目が予想手
+        # （定跡や脅威手順ソルバーで打った手番のあとは読み筋が古いので、1手目も確かめる）
+        self.pv_hint = -1
+        pv = self.principal_variation
+        if continued and len(pv) >= 3 and self.game_moves is not None and len(self.game_moves) >= 2:
+            own_position, opponent_position = self.game_moves[-2:]
+            if (pv[0] == self.position_moves[own_position & 15] 
+                    and pv[1] == self.position_moves[opponent_position & 15]):
+                self.pv_hint = pv[2][1] * 4 + pv[2][0]
+        
+        # キラー手はルートからの深さに依存するので毎手リセットし、ヒストリーは半減させて古い情報を薄める
+        self._age_move_ordering()
+    
+    """
+    置換表の最善手をたどって読み筋を取り出す
+    """
+    def _extract_principal_variation(self, black_board: int, white_board: int, player: int, 
+                                    hash_key: int) -> list[tuple[int, int]]:
+        table = self.transposition_table
+        pv = []
+        
+        while len(pv) < self.search_depth:
+            symmetry = 0
+            if self.use_symmetry:
+                hashes = self._compute_symmetry_hashes(black_board, white_board)
+                hash_key = min(hashes)
+                symmetry = hashes.index(hash_key)
+            index = table.probe(hash_key)
+            if index < 0 or table.moves[index] < 0:
+                break
+            column = table.moves[index]
+            if symmetry:
+                column = self.symmetry_columns_inverse[symmetry][column]
+            black_board, white_board, z = self._make_move_bb(black_board, white_board, column & 3, 
+                                                            column >> 2, player)
+            if z == -1:
+                break
+            pv.append(self.position_moves[column])
+            hash_key ^= self.zobrist_table[z * 16 + column][player - 1]
+            player = 3 - player
+        
+        return pv
+    
+    """
+    手の並び替え情報の世代交代
+    キラー手はクリアし、ヒストリー値は半減させて前の手番の情報を徐々に忘れる
+    """
+    def _age_move_ordering(self):
+        for killers in self.killer_moves:
+            killers[0] = killers[1] = -1
+        for player in (1, 2):
+            self.history[player] = [value >> 1 for value in self.history[player]]
     
     """
     置換表に探索結果を保存
     評価値のタイプ（EXACT/LOWERBOUND/UPPERBOUND）を判定して保存
     """
     def _store_transposition_table(self, hash_key: int, depth: int, score: float, 
-                                  alpha: float, beta: float, best_move: Optional[tuple[int, int]]):
-        # メモリ使用量管理
-        self._manage_table_size()
-        
+                                  alpha: float, beta: float, best_move: Optional[tuple[int, int]], 
+                                  symmetry: int = 0):
         # 評価値のタイプを決定
         if score <= alpha:
-            flag = "UPPERBOUND"
+            flag = TT_UPPERBOUND
         elif score >= beta:
-            flag = "LOWERBOUND"  
+            flag = TT_LOWERBOUND
         else:
-            flag = "EXACT"
-        
-        # エントリを作成・保存
-        entry = TranspositionEntry(
-            hash_key=hash_key,
-            depth=depth,
-            score=score,
-            flag=flag,
-            best_move=best_move
-        )
-        
-        self.transposition_table[hash_key] = entry
+            flag = TT_EXACT
+        
+        # 最善手は y * 4 + x の1バイトにパックし、代表形の座標に変換して保存
+        packed_move = best_move[1] * 4 + best_move[0] if best_move is not None else -1
+        if packed_move >= 0 and symmetry:
+            packed_move = self.symmetry_columns[symmetry][packed_move]
+        table = self.transposition_table
+        if self.stats is not None:
+            self.stats.tt_stores += 1
+            index = table.replacement_slot(hash_key, depth)
+            if table.flags[index] and table.keys[index] != hash_key:
+                self.stats.tt_collisions += 1
+        table.store(hash_key, depth, int(score), flag, packed_move)
 
     """
     メインのAI思考ルーチン
@@ -217,116 +829,366 @@ class MyAI(Alg3D):
         last_move: tuple[int, int, int] # 直前に置かれた場所(x, y, z)
     ) -> tuple[int, int]:
         self.player_num = player
+        self.move_start_time = time.process_time()
+        self.root_moves = FULL_BOARD
+        self.nodes = 0  # ソルバー・完全読み・本探索を通した、この手のノード数
+        self.stats = SearchStats() if self.collect_stats else None
+        self.completed_depth = 0
+        self.root_researches = 0
         
         # 置換表の統計をリセット
         self.tt_hits = 0
         self.tt_queries = 0
         
-        # ビットボードに変換
-        black_board, white_board = self._convert_to_bitboard(board)
+        # ビットボードにする（前回の自分の手番から続いていれば、相手の1手を足すだけで済ませる）
+        black_board, white_board, continued = self._sync_board(board, player, last_move)
+        
+        # 前回の探索状態を引き継ぐ（新しい対局なら破棄する）
+        self._prepare_search_state(black_board, white_board, continued)
+        self.synced_board = (black_board, white_board)
         
         # 有効な手を取得
         valid_moves = self._get_valid_moves_bb(black_board, white_board)
         if not valid_moves:
-            return (0, 0)
+            return self._finish_move((0, 0), "fallback")
+        
+        # 定跡にある局面なら探索せずに即答する
+        if self.use_opening_book and not self.out_of_book:
+            book_move = self._probe_opening_book(black_board, white_board)
+            if book_move is not None:
+                return self._finish_move(book_move, "book")
+            # 定跡は初手から一定の石数までの全局面を持つので、一度外れたらこの対局では引き直さない
+            self.out_of_book = True
         
-        # Minimax + Alpha-Beta探索で最適手を決定（置換表対応版）
-        _, best_move = self._alpha_beta_with_tt(black_board, white_board, self.max_depth, 
-                                              -math.inf, math.inf, True, player)
+        # 脅威手順ソルバーで必勝手・唯一の受けを先に探す（結論が出なければ通常探索）
+        forced_move = self._solve_forced_move(black_board, white_board, player)
+        if forced_move is not None:
+            return self._finish_move(forced_move, "forced")
         
-        # 置換表のヒット率を出力（デバッグ用）
-        # if self.tt_queries > 0:
-        #     hit_rate = (self.tt_hits / self.tt_queries) * 100
-        #     print(f"置換表ヒット率: {hit_rate:.1f}% ({self.tt_hits}/{self.tt_queries})")
+        # 空きマスが少なければ完全読みを試す（時間内に読み切れなければ通常探索）
+        if 64 - popcount(black_board | white_board) <= self.endgame_empty_cells:
+            endgame_move = self._solve_endgame(black_board, white_board, player)
+            if endgame_move is not None:
+                return self._finish_move(endgame_move, "endgame")
+        
+        if self.search_backend == "mcts":
+            # モンテカルロ木探索で持ち時間いっぱいまでプレイアウトする
+            best_move = self._mcts_search(black_board, white_board, player)
+        else:
+            # 反復深化 + Alpha-Beta探索で最適手を決定（置換表対応版）
+            best_move = self._iterative_deepening(black_board, white_board, player)
         
         if best_move is None:
-            return valid_moves[0]
+            return self._finish_move(valid_moves[0], "fallback")
+        
+        return self._finish_move(best_move, self.search_backend)
+    
+    """
+    get_moveの戻り値を返す直前の後処理
+    自分の手を打った後の盤面を次の手番の差分同期用に覚え、統計を取っていれば、手を決めた処理・ノード数・置換表の統計・読み筋を記録する
+    """
+    def _finish_move(self, move: tuple[int, int], source: str) -> tuple[int, int]:
+        self._record_own_move(move)
+        stats = self.stats
+        if stats is not None:
+            stats.source = source
+            stats.move = move
+            stats.time = time.process_time() - self.move_start_time
+            stats.nodes = self.nodes
+            stats.completed_depth = self.completed_depth
+            stats.tt_probes = self.tt_queries
+            stats.tt_hits = self.tt_hits
+            stats.researches = self.root_researches
+            if source == "alphabeta":
+                stats.principal_variation = list(self.principal_variation)
+        return move
+    
+    """
+    反復深化の制御ルーチン
+    深さ1, 2, 3...と探索し、CPU時間(time.process_time)の持ち時間内で完了した最後の反復の最善手を返す
+    次の反復が持ち時間を超えると予測された時点で打ち切る（前回反復との所要時間比で予測）
+    """
+    def _iterative_deepening(self, black_board: int, white_board: int, 
+                            player: int) -> Optional[tuple[int, int]]:
+        self.deadline = self.move_start_time + self.time_limit
+        self.completed_depth = 0
+        
+        # 空きマス数より深く読んでも意味がない
+        empty_count = 64 - popcount(black_board | white_board)
+        max_depth = min(self.max_depth, empty_count)
+        
+        # ゾブリストハッシュはルートでのみ全計算し、以降は差分更新する
+        root_hash = self._compute_zobrist_hash(black_board, white_board)
+        
+        best_move = None
+        last_elapsed = 0.0
+        growth = 4.0  # 1反復ごとの所要時間の増加率（初期推定値）
+        self.root_researches = 0
+        guess = self.last_root_score  # 窓の中心（前の反復、最初の反復では前の手番の評価値）
+        
+        for depth in range(1, max_depth + 1):
+            iteration_start = time.process_time()
+            iteration_nodes = self.nodes
+            iteration_researches = self.root_researches
+            # 打ち切られた反復の途中状態が残らないよう、毎回探索中の局面を作り直す
+            self._init_search_state(black_board, white_board, player, root_hash)
+            self.search_depth = depth
+            try:
+                score, move = self._search_root(depth, guess)
+            except SearchTimeout:
+                break  # 途中で打ち切った反復の結果は使わない
+            self.completed_depth = depth
+            guess = self.last_root_score = score
+            if self.stats is not None:
+                self.stats.iterations.append((depth, self.nodes - iteration_nodes, 
+                                              time.process_time() - iteration_start, score, move, 
+                                              self.root_researches - iteration_researches))
+            
+            if move is not None:
+                best_move = move
+                self.principal_variation = self._extract_principal_variation(black_board, white_board, 
+                                                                             player, root_hash)
+            
+            # 勝ち/負けが確定したらそれ以上読んでも結果は変わらない
+            if abs(score) >= 1000.0:
+                break
+            
+            # ===== 次の反復の所要時間を予測 =====
+            now = time.process_time()
+            elapsed = now - iteration_start
+            if last_elapsed > 0.001:
+                growth = max(2.0, min(16.0, elapsed / last_elapsed))
+            last_elapsed = elapsed
+            if now + elapsed * growth > self.deadline:
+                break
         
         return best_move
     
     """
-    置換表を利用したAlpha-Betaプルーニング付きのMinimax探索
-    ゾブリストハッシュによる高速盤面識別と置換表による重複計算削減
+    ルート局面（search_state）を1回分（深さdepth）探索する。窓の決め方はroot_driverで選ぶ
+    guessは評価値の予想（前の反復の値など、Noneなら不明）。窓から外れた再探索の回数をroot_researchesに足す
     """
-    def _alpha_beta_with_tt(self, black_board: int, white_board: int, depth: int, 
-                           alpha: float, beta: float, maximizing_player: bool, 
-                           current_player: int) -> tuple[float, Optional[tuple[int, int]]]:
-        # ===== Step 1: ゾブリストハッシュを計算 =====
-        hash_key = self._compute_zobrist_hash(black_board, white_board)
+    def _search_root(self, depth: int, guess: Optional[float]) -> tuple[float, Optional[tuple[int, int]]]:
+        if guess is None or self.root_driver == "full":
+            return self._alpha_beta_with_tt(depth, -math.inf, math.inf)
+        if self.root_driver == "mtdf":
+            return self._mtdf_root(depth, guess)
+        return self._aspiration_root(depth, guess)
+    
+    """
+    Aspiration Window: guess±aspiration_window の狭い窓で探索し、
+    fail-low / fail-highした側だけ窓を4倍ずつ広げて（勝敗の値に届けば無限大まで）探索し直す
+    """
+    def _aspiration_root(self, depth: int, guess: float) -> tuple[float, Optional[tuple[int, int]]]:
+        delta = self.aspiration_window
+        alpha, beta = guess - delta, guess + delta
+        
+        while True:
+            score, move = self._alpha_beta_with_tt(depth, alpha, beta)
+            if alpha < score < beta:
+                return score, move
+            
+            self.root_researches += 1
+            delta *= 4
+            if score <= alpha:
+                alpha = score - delta if score - delta > -1000.0 else -math.inf
+            else:
+                beta = score + delta if score + delta < 1000.0 else math.inf
+    
+    """
+    MTD(f): 幅1のnullウィンドウ探索を繰り返し、評価値の上限と下限を挟み込んで確定させる
+    同じ局面を何度も読むので、2回目以降は置換表の結果でほとんどの枝が省略される
+    評価値は整数なので、上限と下限が一致した時点で確定する
+    最善手はfail-high（下限を更新）した探索の手を使う（fail-lowした探索の手は信用できない）
+    """
+    def _mtdf_root(self, depth: int, guess: float) -> tuple[float, Optional[tuple[int, int]]]:
+        lower, upper = -math.inf, math.inf
+        score = guess
+        best_move = None
+        searches = 0
+        
+        while lower < upper:
+            beta = score + 1 if score == lower else score
+            score, move = self._alpha_beta_with_tt(depth, beta - 1, beta)
+            searches += 1
+            if score < beta:
+                upper = score
+            else:
+                lower = score
+                best_move = move
+        
+        self.root_researches += searches - 1
+        return score, best_move
+    
+    """
+    置換表を利用したNegamax形式のPrincipal Variation Search（NegaScout）
+    評価値は常に手番側(current_player)から見た値で、子ノードの値は符号を反転して使う
+    最初の手（置換表の最善手）だけ全幅ウィンドウで探索し、残りはnullウィンドウで
+    「最初の手より良くないこと」を確かめ、fail-highした手だけ再探索する
+    局面はsearch_stateで、子ノードはmake/unmakeで同じ状態を書き換えて探索する
+    """
+    def _alpha_beta_with_tt(self, depth: int, alpha: float, 
+                           beta: float) -> tuple[float, Optional[tuple[int, int]]]:
+        # ===== Step 0: 持ち時間チェック（1024ノードごと） =====
+        self.nodes += 1
+        if not (self.nodes & 1023) and time.process_time() > self.deadline:
+            raise SearchTimeout()
+        
+        state = self.search_state
+        black_board, white_board, current_player = state.black, state.white, state.player
+        
+        # ===== Step 1: ゾブリストハッシュの検証（デバッグ時のみ） =====
+        if self.debug_hash:
+            assert state.hash_key == self._compute_zobrist_hash(black_board, white_board), "差分ハッシュ不一致"
+            assert state.heights == [popcount((black_board | white_board) & mask) for mask in self.column_masks], \
+                "列の高さ不一致"
         original_alpha = alpha  # 置換表保存用に元のalpha値を保持
         
         # ===== Step 2: 置換表をチェック =====
-        found, tt_score, tt_best_move = self._lookup_transposition_table(hash_key, depth, alpha, beta)
-        if found:
+        # 対称性モードでは8通りの対称形のうちハッシュ値が最小のものを代表形としてキーにする
+        if self.use_symmetry:
+            tt_key = min(state.symmetry_hashes)
+            symmetry = state.symmetry_hashes.index(tt_key)
+        else:
+            tt_key = state.hash_key
+            symmetry = 0
+        
+        # ルートでは除外手（root_moves）を守るため、置換表の値で探索を省略しない
+        is_root = depth == self.search_depth
+        found, tt_score, tt_best_move = self._lookup_transposition_table(tt_key, depth, alpha, beta, symmetry)
+        if found and not is_root:
             return tt_score, tt_best_move
         
         # ===== Step 3: 終了条件のチェック =====
-        if depth == 0 or self._is_terminal_bb(black_board, white_board):
-            score = self._evaluate_board_bb(black_board, white_board)
+        # 勝敗は直前の手を打った時点で親ノードが判定済みなので、ここでは満杯だけを見る
+        if depth == 0 or ((black_board | white_board) >> 48) == BOTTOM_LAYER:
+            score = self._evaluate_position_bb(black_board, white_board, current_player)
             # 葉ノードの結果も置換表に保存
-            self._store_transposition_table(hash_key, depth, score, original_alpha, beta, None)
+            self._store_transposition_table(tt_key, depth, score, original_alpha, beta, None)
             return score, None
         
-        # ===== Step 4: 有効手の取得と手の並び替え =====
-        valid_moves = self._get_valid_moves_bb(black_board, white_board)
-        if not valid_moves:
-            score = self._evaluate_board_bb(black_board, white_board)
-            self._store_transposition_table(hash_key, depth, score, original_alpha, beta, None)
-            return score, None
+        # ===== Step 4: 着手可能マスの取得と手の並び替え =====
+        # 各列の次に石が入るマスを1つのビットマスクで得る
+        playable = self._get_playable_bb(black_board, white_board)
+        if is_root:
+            playable &= self.root_moves
+        
+        # 脅威マップ（そのマスに打てば4つ揃う空きマスの集合）による強制手の処理
+        # 脅威マップは親ノードで打った1手分だけ差分更新したものを使う
+        opponent = 3 - current_player
+        track_threats = depth >= self.threat_pruning_depth
+        if track_threats:
+            if self.debug_threats:
+                assert state.threat_cells[1] == self._winning_cells_bb(black_board, white_board), "黒の脅威マップ不一致"
+                assert state.threat_cells[2] == self._winning_cells_bb(white_board, black_board), "白の脅威マップ不一致"
+            
+            # (a) 今打てる自分の脅威マスがあれば即勝ち（他の手を読む必要はない）
+            wins = state.threat_cells[current_player] & playable
+            if wins:
+                score = 1000.0 + depth - 1
+                best_move = self.position_moves[(wins & -wins).bit_length() - 1]
+                self._store_transposition_table(tt_key, depth, score, original_alpha, beta, best_move, symmetry)
+                return score, best_move
+            
+            # 相手に次の手で勝たれたときの評価値（子ノードでの相手の勝ちの値の符号反転）
+            loss_score = -(1000.0 + depth - 2)
+            opp_threats = state.threat_cells[opponent]
+            blocks = opp_threats & playable
+            if blocks:
+                # (b) 今打てる相手の脅威マスは塞ぐしかない（2か所以上あればどれを塞いでも負け）
+                if blocks & (blocks - 1) and not is_root:
+                    self._store_transposition_table(tt_key, depth, loss_score, original_alpha, beta, None)
+                    return loss_score, None
+                playable = blocks
+            else:
+                # (c) 相手の脅威マスの真下に打つと、そのマスが空いて相手に勝たれる
+                safe = playable & ~(opp_threats >> 16)
+                if safe:
+                    playable = safe
+                elif not is_root:
+                    self._store_transposition_table(tt_key, depth, loss_score, original_alpha, beta, None)
+                    return loss_score, None
+        
+        move_bits = []
         
         # 置換表から得た最善手を最初に試す（手の並び替えで高速化）
-        if tt_best_move and tt_best_move in valid_moves:
-            valid_moves.remove(tt_best_move)
-            valid_moves.insert(0, tt_best_move)
+        # ルートで置換表に手がなければ、前回の読み筋からの予想手を使う
+        if tt_best_move is None and is_root and self.pv_hint >= 0:
+            tt_best_move = self.position_moves[self.pv_hint]
+        if tt_best_move is not None:
+            tt_bit = playable & self.column_masks[tt_best_move[1] * 4 + tt_best_move[0]]
+            if tt_bit:
+                move_bits.append(tt_bit)
+                playable ^= tt_bit
+        
+        # 次に同じ深さでβカットを起こしたキラー手を試す
+        killers = self.killer_moves[self.search_depth - depth]
+        for column in killers:
+            if column >= 0:
+                killer_bit = playable & self.column_masks[column]
+                if killer_bit:
+                    move_bits.append(killer_bit)
+                    playable ^= killer_bit
         
+        # 残りの手はヒストリー値の大きい順
+        history = self.history[current_player]
+        remaining = []
+        while playable:
+            bit = playable & -playable
+            remaining.append(bit)
+            playable ^= bit
+        if len(remaining) > 1:
+            remaining.sort(key=lambda bit: history[(bit.bit_length() - 1) & 15], reverse=True)
+        move_bits += remaining
+        
+        # この手番で勝った場合の評価値（残り深さが大きいほど早い勝ち）
+        win_score = 1000.0 + depth - 1
+        best_score = -math.inf
+        # 子ノードも脅威マップを使うなら、打った手の分だけ差分更新する
+        update_threats = depth > self.threat_pruning_depth
+        my_board = black_board if current_player == 1 else white_board
         best_move = None
         
-        # ===== Step 5: Minimax探索の実行 =====
-        if maximizing_player:
-            max_eval = -math.inf
-            for move in valid_moves:
-                x, y = move
-                new_black, new_white, z = self._make_move_bb(black_board, white_board, x, y, current_player)
-                if z == -1:
-                    continue
-                
-                eval_score, _ = self._alpha_beta_with_tt(new_black, new_white, depth - 1, alpha, beta, False, 
-                                                       2 if current_player == 1 else 1)
-                
-                if eval_score > max_eval:
-                    max_eval = eval_score
-                    best_move = move
-                
-                alpha = max(alpha, eval_score)
-                if beta <= alpha:
-                    break  # Alpha-Betaプルーニング
+        # ===== Step 5: PVS探索の実行 =====
+        for bit in move_bits:
+            # 落下位置はビットそのもの（z方向の走査は不要）
+            position = bit.bit_length() - 1
             
-            # ===== Step 6: 結果を置換表に保存 =====
-            self._store_transposition_table(hash_key, depth, max_eval, original_alpha, beta, best_move)
-            return max_eval, best_move
+            # 打ったマスを通るラインだけで勝敗判定（早い勝ち・遅い負けを優先）
+            if self._check_win_at(my_board | bit, position):
+                score = win_score
+            else:
+                state.make(position & 15, update_threats)
+                if best_move is None:
+                    # 最初の手は全幅ウィンドウで探索
+                    score = -self._alpha_beta_with_tt(depth - 1, -beta, -alpha)[0]
+                else:
+                    # 残りの手はnullウィンドウで探索し、alphaを超えたら全幅で再探索
+                    score = -self._alpha_beta_with_tt(depth - 1, -alpha - 1, -alpha)[0]
+                    if alpha < score < beta:
+                        score = -self._alpha_beta_with_tt(depth - 1, -beta, -alpha)[0]
+                state.unmake()
             
-        else:
-            min_eval = math.inf
-            for move in valid_moves:
-                x, y = move
-                new_black, new_white, z = self._make_move_bb(black_board, white_board, x, y, current_player)
-                if z == -1:
-                    continue
-                
-                eval_score, _ = self._alpha_beta_with_tt(new_black, new_white, depth - 1, alpha, beta, True, 
-                                                       2 if current_player == 1 else 1)
-                
-                if eval_score < min_eval:
-                    min_eval = eval_score
-                    best_move = move
-                
-                beta = min(beta, eval_score)
-                if beta <= alpha:
-                    break  # Alpha-Betaプルーニング
+            if score > best_score:
+                best_score = score
+                best_move = self.position_moves[position]
             
-            # ===== Step 6: 結果を置換表に保存 =====
-            self._store_transposition_table(hash_key, depth, min_eval, original_alpha, beta, best_move)
-            return min_eval, best_move
+            if score > alpha:
+                alpha = score
+                if alpha >= beta:
+                    if self.stats is not None:
+                        self.stats.cutoffs[move_bits.index(bit)] += 1
+                    # βカットを起こした手をキラー手とヒストリーに記録
+                    column = position & 15
+                    if killers[0] != column:
+                        killers[1] = killers[0]
+                        killers[0] = column
+                    history[column] += depth * depth
+                    break  # Beta cut
+        
+        # ===== Step 6: 結果を置換表に保存 =====
+        self._store_transposition_table(tt_key, depth, best_score, original_alpha, beta, best_move, symmetry)
+        return best_score, best_move
     
     # ===== ビットボード関連の基本操作 =====
     
@@ -349,50 +1211,128 @@ class MyAI(Alg3D):
         
         return black_board, white_board
     
+    """
+    get_moveに渡された盤面をビットボードにする
+    前回自分が打った直後の盤面(synced_board)に相手の手(last_move)を足し、渡された盤面と
+    各列の一番上の石と次に石が入るマスだけ突き合わせて（スポットチェック）一致すれば全マスの変換を省く
+    前回の盤面がない（新しい対局・途中の局面から呼ばれた）・一致しないときは全マスを変換し直す
+    戻り値: (黒, 白, 前回の自分の手番から続いているか)
+    """
+    def _sync_board(self, board: list[list[list[int]]], player: int, 
+                    last_move: tuple[int, int, int]) -> tuple[int, int, bool]:
+        synced = self.synced_board
+        self.synced_board = None
+        if synced is not None and last_move is not None and last_move[0] is not None:
+            x, y, z = last_move
+            black_board, white_board = synced
+            if 0 <= x < 4 and 0 <= y < 4:
+                bit = self._get_playable_bb(black_board, white_board) & self.column_masks[y * 4 + x]
+                if bit and bit == 1 << (z * 16 + y * 4 + x):
+                    if player == 1:
+                        white_board |= bit
+                    else:
+                        black_board |= bit
+                    if self._board_matches(board, black_board, white_board):
+                        if self.debug_sync:
+                            assert (black_board, white_board) == self._convert_to_bitboard(board), "差分同期の盤面不一致"
+                        if self.game_moves is not None:
+                            self.game_moves.append(bit.bit_length() - 1)
+                        return black_board, white_board, True
+        
+        black_board, white_board = self._convert_to_bitboard(board)
+        occupied = black_board | white_board
+        if not occupied & (occupied - 1):
+            # 石が1つ以下なら対局の最初からの棋譜が分かる
+            self.game_moves = [occupied.bit_length() - 1] if occupied else []
+        else:
+            self.game_moves = None
+        return black_board, white_board, False
+    
+    """
+    ビットボードが盤面と一致するかを簡易的に確かめる
+    各列の一番上の石の色と、その上（次に石が入るマス）が空きであることだけを見る（最大32マス）
+    """
+    def _board_matches(self, board: list[list[list[int]]], black_board: int, white_board: int) -> bool:
+        occupied = black_board | white_board
+        tops = occupied & ~(occupied >> 16)
+        while tops:
+            bit = tops & -tops
+            position = bit.bit_length() - 1
+            if board[position >> 4][(position >> 2) & 3][position & 3] != (1 if black_board & bit else 2):
+                return False
+            tops ^= bit
+        
+        playable = self._get_playable_bb(black_board, white_board)
+        while playable:
+            bit = playable & -playable
+            position = bit.bit_length() - 1
+            if board[position >> 4][(position >> 2) & 3][position & 3] != 0:
+                return False
+            playable ^= bit
+        return True
+    
+    """
+    get_moveで返す自分の手を、覚えておいた盤面(synced_board)と棋譜に加える
+    打てない手（置き場所のない列）を返したときはサーバ側で強制配置になるので、次の手番は全マスを変換する
+    """
+    def _record_own_move(self, move: tuple[int, int]):
+        if self.synced_board is None:
+            return
+        black_board, white_board = self.synced_board
+        x, y = move
+        bit = 0
+        if 0 <= x < 4 and 0 <= y < 4:
+            bit = self._get_playable_bb(black_board, white_board) & self.column_masks[y * 4 + x]
+        if not bit:
+            self.synced_board = None
+            self.game_moves = None
+            return
+        if self.player_num == 1:
+            self.synced_board = (black_board | bit, white_board)
+        else:
+            self.synced_board = (black_board, white_board | bit)
+        if self.game_moves is not None:
+            self.game_moves.append(bit.bit_length() - 1)
+    
+    """
+    各列で次に石が入るマス（着手可能マス）のビットマスクを返す
+    重力で石は下から詰まっているので、石の1つ上のマスと最下層の空きマスが着手可能マスになる
+    ((occupied << 16) | 最下層) & ~occupied で全16列分を一度に計算できる
+    """
+    def _get_playable_bb(self, black_board: int, white_board: int) -> int:
+        occupied = black_board | white_board
+        return ((occupied << 16) | BOTTOM_LAYER) & ~occupied & FULL_BOARD
+    
     """
     ビットボードから有効な手を取得
-    各(x,y)位置の最上層（z=3）が空いているかをチェック
+    着手可能マスのビットを(x, y)に変換して列挙
     """
     def _get_valid_moves_bb(self, black_board: int, white_board: int) -> list[tuple[int, int]]:
         valid_moves = []
-        occupied = black_board | white_board
+        playable = self._get_playable_bb(black_board, white_board)
         
-        for x in range(4):
-            for y in range(4):
-                # 一番上の層（z=3）が空かチェック
-                top_bit_pos = 3 * 16 + y * 4 + x
-                if not (occupied & (1 << top_bit_pos)):
-                    valid_moves.append((x, y))
+        while playable:
+            bit = playable & -playable
+            valid_moves.append(self.position_moves[bit.bit_length() - 1])
+            playable ^= bit
         
         return valid_moves
     
     """
     ビットボードに手を打ち、新しいボードとz座標を返す
-    重力により下から順に石が積み重なる
+    着手可能マスと列マスクのANDで落下位置を1回で求める
     """
     def _make_move_bb(self, black_board: int, white_board: int, x: int, y: int, 
                      player: int) -> tuple[int, int, int]:
-        occupied = black_board | white_board
+        bit = self._get_playable_bb(black_board, white_board) & self.column_masks[y * 4 + x]
+        if not bit:
+            return black_board, white_board, -1  # 置けない場合
         
-        # 下から順に空いている位置を探す
-        for z in range(4):
-            bit_pos = z * 16 + y * 4 + x
-            if not (occupied & (1 << bit_pos)):
-                if player == 1:  # 黒
-                    return black_board | (1 << bit_pos), white_board, z
-                else:  # 白
-                    return black_board, white_board | (1 << bit_pos), z
-        
-        return black_board, white_board, -1  # 置けない場合
-    
-    """
-    ビットボード版ゲーム終了判定
-    勝者がいるか、盤面が満杯かをチェック
-    """
-    def _is_terminal_bb(self, black_board: int, white_board: int) -> bool:
-        if self._check_win_bb(black_board) or self._check_win_bb(white_board):
-            return True
-        return len(self._get_valid_moves_bb(black_board, white_board)) == 0
+        z = (bit.bit_length() - 1) >> 4
+        if player == 1:  # 黒
+            return black_board | bit, white_board, z
+        else:  # 白
+            return black_board, white_board | bit, z
     
     """
     ビットボード版勝利判定
@@ -405,78 +1345,655 @@ class MyAI(Alg3D):
         return False
     
     """
-    4つ並びの勝利パターンを事前計算
-    13方向（X/Y/Z軸、各種対角線）の全パターンをビットマスクで生成
-    """
-    def _generate_win_patterns(self) -> list[int]:
-        patterns = []
-        
-        directions = [
-            (1, 0, 0),   # X軸方向
-            (0, 1, 0),   # Y軸方向  
-            (0, 0, 1),   # Z軸方向
-            (1, 1, 0),   # XY平面の斜め
-            (1, -1, 0),
-            (1, 0, 1),   # XZ平面の斜め
-            (1, 0, -1),
-            (0, 1, 1),   # YZ平面の斜め
-            (0, 1, -1),
-            (1, 1, 1),   # 3D対角線
-            (1, 1, -1),
-            (1, -1, 1),
-            (-1, 1, 1)
-        ]
+    直前に石を置いたマスを通るラインだけを調べる勝利判定
+    探索中は打った直後にこちらを使い、全パターン走査(_check_win_bb)はdebug_evalの検証に使う
+    """
+    def _check_win_at(self, board: int, position: int) -> bool:
+        for pattern in self.cell_lines[position]:
+            if (board & pattern) == pattern:
+                return True
+        return False
+    
+    # ===== 定跡 =====
+    
+    """
+    OPENING_BOOK_DATA（base64 + zlib）を {(代表形の黒, 代表形の白): 列番号} の辞書に展開する
+    """
+    def _load_opening_book(self) -> dict[tuple[int, int], int]:
+        book = {}
+        if not OPENING_BOOK_DATA:
+            return book
         
-        for z in range(4):
-            for y in range(4):
-                for x in range(4):
-                    for dx, dy, dz in directions:
-                        pattern = 0
-                        valid = True
-                        
-                        for i in range(4):
-                            nx, ny, nz = x + i * dx, y + i * dy, z + i * dz
-                            if 0 <= nx < 4 and 0 <= ny < 4 and 0 <= nz < 4:
-                                bit_pos = nz * 16 + ny * 4 + nx
-                                pattern |= (1 << bit_pos)
-                            else:
-                                valid = False
-                                break
-                        
-                        if valid and pattern not in patterns:
-                            patterns.append(pattern)
-        
-        return patterns
+        data = zlib.decompress(base64.b64decode(OPENING_BOOK_DATA))
+        for offset in range(0, len(data) - 16, 17):
+            black_board = int.from_bytes(data[offset:offset + 8], 'little')
+            white_board = int.from_bytes(data[offset + 8:offset + 16], 'little')
+            book[(black_board, white_board)] = data[offset + 16]
+        return book
+    
+    """
+    定跡を引く。代表形の手を現局面の座標に戻して返す（定跡にない、または打てない手ならNone）
+    """
+    def _probe_opening_book(self, black_board: int, white_board: int) -> Optional[tuple[int, int]]:
+        if self.opening_book is None:
+            self.opening_book = self._load_opening_book()
+        if not self.opening_book:
+            return None
+        
+        key, symmetry = self._canonical_position(black_board, white_board)
+        column = self.opening_book.get(key)
+        if column is None:
+            return None
+        
+        column = self.symmetry_columns_inverse[symmetry][column]
+        if not (self._get_playable_bb(black_board, white_board) & self.column_masks[column]):
+            return None
+        return self.position_moves[column]
+    
+    # ===== 脅威手順ソルバー =====
+    
+    """
+    あと1石で4つ揃う空きマス（脅威マス）のビットマスクを返す
+    相手の石がなく、自分の石が3つあるラインの残り1マスを集める
+    方向ごとのシフトとANDで、76ラインを13回のビット演算でまとめて調べる
+    """
+    def _winning_cells_bb(self, my_board: int, opp_board: int) -> int:
+        empty = ~(my_board | opp_board) & FULL_BOARD
+        cells = 0
+        
+        for step, starts in self.line_directions:
+            # 始点pから k * step 先のマスの状態を、始点の位置にそろえる
+            m1, m2, m3 = my_board >> step, my_board >> (2 * step), my_board >> (3 * step)
+            m0 = my_board & starts
+            
+            # 空きマスがラインのk番目にある場合（残り3マスが自分の石）
+            cells |= starts & empty & m1 & m2 & m3
+            cells |= (m0 & (empty >> step) & m2 & m3) << step
+            cells |= (m0 & m1 & (empty >> (2 * step)) & m3) << (2 * step)
+            cells |= (m0 & m1 & m2 & (empty >> (3 * step))) << (3 * step)
+        
+        return cells
+    
+    """
+    positionを通るラインだけから脅威マスを集める（直前の1手で新しくできた脅威の検出用）
+    """
+    def _winning_cells_at(self, my_board: int, opp_board: int, position: int) -> int:
+        cells = 0
+        for pattern in self.cell_lines[position]:
+            if not (opp_board & pattern):
+                rest = pattern & ~my_board
+                if rest and not (rest & (rest - 1)):
+                    cells |= rest
+        return cells
+    
+    """
+    脅威手順の探索（攻め手 = my_board側の手番）
+    攻め手は「すぐに打てる脅威マスを作る手」だけを、受け手はその脅威を塞ぐ手だけを指すので
+    全幅探索よりはるかに深く読める
+    必勝手順が見つかればその初手の列番号(y * 4 + x)、見つからなければ-1を返す
+    """
+    def _solve_threat_sequence(self, my_board: int, opp_board: int, depth: int) -> int:
+        self.nodes += 1
+        if not (self.nodes & 1023) and time.process_time() > self.deadline:
+            raise SearchTimeout()
+        
+        occupied = my_board | opp_board
+        playable = ((occupied << 16) | BOTTOM_LAYER) & ~occupied & FULL_BOARD
+        
+        # すぐに勝てるならそれが答え
+        my_threats = self._winning_cells_bb(my_board, opp_board)
+        wins = my_threats & playable
+        if wins:
+            return ((wins & -wins).bit_length() - 1) & 15
+        if depth == 0:
+            return -1
+        
+        # 相手にすぐ打てる脅威マスがあれば、それを塞ぐ手しか指せない
+        opp_threats = self._winning_cells_bb(opp_board, my_board)
+        opp_wins = opp_threats & playable
+        if opp_wins:
+            if opp_wins & (opp_wins - 1):
+                return -1  # 2か所同時には塞げない
+            candidates = opp_wins
+        else:
+            candidates = playable
+        
+        while candidates:
+            bit = candidates & -candidates
+            candidates ^= bit
+            position = bit.bit_length() - 1
+            
+            new_my = my_board | bit
+            new_occupied = occupied | bit
+            new_playable = ((new_occupied << 16) | BOTTOM_LAYER) & ~new_occupied & FULL_BOARD
+            
+            # 真上のマスを相手の勝ちマスとして差し出す手は不可
+            if opp_threats & new_playable:
+                continue
+            
+            # この手で打てる脅威マスができなければ脅威手順にならない
+            threats = (my_threats | self._winning_cells_at(new_my, opp_board, position)) & new_playable
+            if not threats:
+                continue
+            if threats & (threats - 1):
+                return position & 15  # 2か所の脅威は同時に塞げないので勝ち
+            
+            # 相手は唯一の脅威マスを塞ぐしかない
+            if self._solve_threat_sequence(new_my, opp_board | threats, depth - 1) >= 0:
+                return position & 15
+        
+        return -1
+    
+    """
+    通常探索の前に脅威手順ソルバーで結論を出せる手を探す
+    1. 自分に脅威手順による必勝手があればそれを返す
+    2. 各着手後に相手の必勝手順が残る手を危険手としてroot_movesから除外し、
+       安全な手が1つしかなければそれを返す
+    結論が出なければNone（通常の探索に任せる）
+    """
+    def _solve_forced_move(self, black_board: int, white_board: int, 
+                          player: int) -> Optional[tuple[int, int]]:
+        self.deadline = self.move_start_time + self.time_limit * self.threat_time_ratio
+        
+        my_board = black_board if player == 1 else white_board
+        opp_board = white_board if player == 1 else black_board
+        playable = self._get_playable_bb(black_board, white_board)
+        
+        safe_moves = playable
+        try:
+            # ===== 自分の必勝手順 =====
+            column = self._solve_threat_sequence(my_board, opp_board, self.threat_search_depth)
+            if column >= 0:
+                return (column & 3, column >> 2)
+            
+            # ===== 相手の必勝手順を許す手を除外 =====
+            candidates = playable
+            while candidates:
+                bit = candidates & -candidates
+                candidates ^= bit
+                if self._solve_threat_sequence(opp_board, my_board | bit, self.threat_search_depth) >= 0:
+                    safe_moves ^= bit
+        except SearchTimeout:
+            pass  # 時間切れまでに危険と証明できた手だけを除外する
+        
+        if not safe_moves:
+            return None  # どの手も負けるなら通常探索で粘る手を選ぶ
+        
+        self.root_moves = safe_moves
+        if not (safe_moves & (safe_moves - 1)):
+            return self.position_moves[safe_moves.bit_length() - 1]
+        return None
+    
+    # ===== 終盤の完全読み =====
+    
+    """
+    終盤の完全読みのルート
+    評価値は 勝ち: +(勝った時点の空きマス数 + 1)、引き分け: 0、負け: -(負けた時点の空きマス数 + 1)
+    なので、勝つなら最短、負けるなら最長の手順を選ぶ
+    持ち時間(endgame_time_ratio)内に読み切れなければNoneを返す
+    """
+    def _solve_endgame(self, black_board: int, white_board: int, 
+                      player: int) -> Optional[tuple[int, int]]:
+        self.deadline = self.move_start_time + self.time_limit * self.endgame_time_ratio
+        if time.process_time() >= self.deadline:
+            return None
+        self.endgame_table.new_generation()
+        
+        hash_key = self._compute_zobrist_hash(black_board, white_board)
+        empty_count = 64 - popcount(black_board | white_board)
+        playable = self._get_playable_bb(black_board, white_board)
+        alpha = -math.inf
+        best_move = None
+        
+        try:
+            for bit in self._order_endgame_moves(black_board, white_board, player, playable, -1):
+                position = bit.bit_length() - 1
+                if player == 1:
+                    new_black, new_white = black_board | bit, white_board
+                else:
+                    new_black, new_white = black_board, white_board | bit
+                
+                if self._check_win_at(new_black if player == 1 else new_white, position):
+                    return self.position_moves[position]  # 即勝ちが最短
+                
+                new_hash = hash_key ^ self.zobrist_table[position][player - 1]
+                score = -self._endgame_negamax(new_black, new_white, 3 - player, empty_count - 1, 
+                                               -math.inf, -alpha, new_hash)
+                if score > alpha:
+                    alpha = score
+                    best_move = self.position_moves[position]
+        except SearchTimeout:
+            return None
+        
+        return best_move
+    
+    """
+    完全読みのNegamax探索（評価値はplayerから見た値、empty_countは現局面の空きマス数）
+    即勝ち・相手の即勝ちの阻止・相手の脅威マスの真下を避ける手の絞り込みで枝を減らす
+    """
+    def _endgame_negamax(self, black_board: int, white_board: int, player: int, empty_count: int, 
+                        alpha: float, beta: float, hash_key: int) -> int:
+        self.nodes += 1
+        if not (self.nodes & 1023) and time.process_time() > self.deadline:
+            raise SearchTimeout()
+        
+        playable = self._get_playable_bb(black_board, white_board)
+        if not playable:
+            return 0  # 満杯で引き分け
+        
+        my_board = black_board if player == 1 else white_board
+        opp_board = white_board if player == 1 else black_board
+        
+        # 即勝ち: 打った後の空きマス数 + 1
+        if self._winning_cells_bb(my_board, opp_board) & playable:
+            return empty_count
+        
+        # 相手の即勝ちは塞ぐしかない（2か所あれば次の手で負け）
+        opp_threats = self._winning_cells_bb(opp_board, my_board)
+        opp_wins = opp_threats & playable
+        if opp_wins:
+            if opp_wins & (opp_wins - 1):
+                return -(empty_count - 1)
+            playable = opp_wins
+        else:
+            # 相手の脅威マスの真下に打つと相手に勝たれる
+            safe = playable & ~(opp_threats >> 16)
+            if not safe:
+                return -(empty_count - 1)
+            playable = safe
+        
+        # 最短でも次の自分の手番での勝ちなので、それ以上の値はない
+        upper = empty_count - 2
+        if beta > upper:
+            beta = upper
+            if alpha >= beta:
+                return beta
+        
+        # 置換表
+        original_alpha = alpha
+        table = self.endgame_table
+        index = table.probe(hash_key)
+        tt_column = -1
+        if index >= 0:
+            tt_column = table.moves[index]
+            flag, score = table.flags[index], table.scores[index]
+            if flag == TT_EXACT:
+                return score
+            elif flag == TT_LOWERBOUND and score >= beta:
+                return score
+            elif flag == TT_UPPERBOUND and score <= alpha:
+                return score
+        
+        best_score = -math.inf
+        best_column = -1
+        for bit in self._order_endgame_moves(black_board, white_board, player, playable, tt_column):
+            position = bit.bit_length() - 1
+            if player == 1:
+                new_black, new_white = black_board | bit, white_board
+            else:
+                new_black, new_white = black_board, white_board | bit
+            
+            new_hash = hash_key ^ self.zobrist_table[position][player - 1]
+            score = -self._endgame_negamax(new_black, new_white, 3 - player, empty_count - 1, 
+                                           -beta, -alpha, new_hash)
+            if score > best_score:
+                best_score = score
+                best_column = position & 15
+            if score > alpha:
+                alpha = score
+                if alpha >= beta:
+                    break
+        
+        if best_score <= original_alpha:
+            flag = TT_UPPERBOUND
+        elif best_score >= beta:
+            flag = TT_LOWERBOUND
+        else:
+            flag = TT_EXACT
+        table.store(hash_key, empty_count, best_score, flag, best_column)
+        return best_score
+    
+    """
+    完全読み用の手の並び替え
+    置換表の手を先頭に、残りは打った後にできる自分の脅威マスが多い順
+    """
+    def _order_endgame_moves(self, black_board: int, white_board: int, player: int, 
+                            playable: int, tt_column: int) -> list[int]:
+        my_board = black_board if player == 1 else white_board
+        opp_board = white_board if player == 1 else black_board
+        empty = ~(black_board | white_board) & FULL_BOARD
+        
+        first = []
+        scored = []
+        while playable:
+            bit = playable & -playable
+            playable ^= bit
+            position = bit.bit_length() - 1
+            if (position & 15) == tt_column:
+                first.append(bit)
+                continue
+            threats = self._winning_cells_at(my_board | bit, opp_board, position) & empty & ~bit
+            scored.append((popcount(threats), bit))
+        
+        scored.sort(reverse=True)
+        return first + [bit for _, bit in scored]
+    
+    # ===== モンテカルロ木探索（MCTS） =====
+    
+    """
+    UCTによるモンテカルロ木探索のルート
+    選択 → 展開 → ランダムプレイアウト → 逆伝播 を持ち時間(CPU時間)まで繰り返し、
+    最も訪問回数の多いルートの子の手を返す
+    """
+    def _mcts_search(self, black_board: int, white_board: int, 
+                    player: int) -> Optional[tuple[int, int]]:
+        self.deadline = self.move_start_time + self.time_limit
+        
+        if self.mcts_visits is None or len(self.mcts_visits) != self.mcts_capacity:
+            self._mcts_allocate()
+        
+        # ルートノード（moverは直前に打った相手）
+        self.mcts_node_count = 0
+        root = self._mcts_new_node(-1, -1, 3 - player, 0, black_board, white_board)
+        
+        visits = self.mcts_visits
+        terminal = self.mcts_terminal
+        first_child = self.mcts_first_child
+        
+        iteration = 0
+        while True:
+            iteration += 1
+            if not (iteration & 63) and time.process_time() > self.deadline:
+                break
+            
+            # ===== 選択: 展開済みのノードをUCT値の最大の子へ下る =====
+            node = root
+            while first_child[node] >= 0 and not terminal[node]:
+                node = self._mcts_select_child(node)
+            
+            # ===== 展開: 1度訪問されたノードなら子ノードを作り、最初の子からプレイアウト =====
+            if not terminal[node] and (visits[node] > 0 or node == root):
+                if self._mcts_expand(node):
+                    node = first_child[node]
+            
+            # ===== プレイアウト =====
+            if terminal[node] == 1:
+                winner = self.mcts_mover[node]
+            elif terminal[node] == 2:
+                winner = 0
+            else:
+                winner = self._mcts_playout(self.mcts_black[node], self.mcts_white[node], 
+                                            3 - self.mcts_mover[node])
+            
+            # ===== 逆伝播: 各ノードのmoverから見た勝ち数を加算 =====
+            while node >= 0:
+                visits[node] += 1
+                if winner == 0:
+                    self.mcts_wins[node] += 0.5
+                elif winner == self.mcts_mover[node]:
+                    self.mcts_wins[node] += 1.0
+                node = self.mcts_parent[node]
+            self.nodes += 1
+        
+        # 最も訪問回数の多い子が最善手
+        best_child = -1
+        for child in range(first_child[root], first_child[root] + self.mcts_child_count[root]):
+            if best_child < 0 or visits[child] > visits[best_child]:
+                best_child = child
+        if best_child < 0:
+            return None
+        return self.position_moves[self.mcts_position[best_child]]
+    
+    """
+    mcts_capacity個分のノードプールを確保する
+    """
+    def _mcts_allocate(self):
+        capacity = self.mcts_capacity
+        self.mcts_parent = array('i', bytes(4 * capacity))
+        self.mcts_first_child = array('i', bytes(4 * capacity))  # -1なら未展開
+        self.mcts_child_count = array('b', bytes(capacity))
+        self.mcts_position = array('b', bytes(capacity))  # このノードに至る着手のビット位置
+        self.mcts_mover = array('b', bytes(capacity))  # このノードに至る着手をしたプレイヤー
+        self.mcts_terminal = array('b', bytes(capacity))  # 0: 続行, 1: moverの勝ち, 2: 引き分け
+        self.mcts_visits = array('i', bytes(4 * capacity))
+        self.mcts_wins = array('d', bytes(8 * capacity))  # moverから見た勝ち数（引き分けは0.5）
+        self.mcts_black = array('Q', bytes(8 * capacity))
+        self.mcts_white = array('Q', bytes(8 * capacity))
+    
+    """
+    ノードプールに新しいノードを確保して番号を返す
+    """
+    def _mcts_new_node(self, parent: int, position: int, mover: int, terminal: int, 
+                      black_board: int, white_board: int) -> int:
+        node = self.mcts_node_count
+        self.mcts_node_count += 1
+        self.mcts_parent[node] = parent
+        self.mcts_first_child[node] = -1
+        self.mcts_child_count[node] = 0
+        self.mcts_position[node] = position
+        self.mcts_mover[node] = mover
+        self.mcts_terminal[node] = terminal
+        self.mcts_visits[node] = 0
+        self.mcts_wins[node] = 0.0
+        self.mcts_black[node] = black_board
+        self.mcts_white[node] = white_board
+        return node
+    
+    """
+    ノードの全ての合法手について子ノードを連続した番号で作る
+    ノードプールが足りなければ展開せずFalseを返す（そのノードからプレイアウトを続ける）
+    """
+    def _mcts_expand(self, node: int) -> bool:
+        black_board, white_board = self.mcts_black[node], self.mcts_white[node]
+        player = 3 - self.mcts_mover[node]
+        playable = self._get_playable_bb(black_board, white_board)
+        if self.mcts_parent[node] < 0:
+            playable &= self.root_moves  # ルートでは脅威手順ソルバーが負けと証明した手を除く
+        if not playable or self.mcts_node_count + 16 > self.mcts_capacity:
+            return False
+        
+        self.mcts_first_child[node] = self.mcts_node_count
+        count = 0
+        while playable:
+            bit = playable & -playable
+            playable ^= bit
+            position = bit.bit_length() - 1
+            if player == 1:
+                new_black, new_white = black_board | bit, white_board
+            else:
+                new_black, new_white = black_board, white_board | bit
+            
+            if self._check_win_at(new_black if player == 1 else new_white, position):
+                result = 1
+            elif ((new_black | new_white) >> 48) == BOTTOM_LAYER:
+                result = 2
+            else:
+                result = 0
+            self._mcts_new_node(node, position, player, result, new_black, new_white)
+            count += 1
+        
+        self.mcts_child_count[node] = count
+        return True
+    
+    """
+    UCT値（勝率 + 探索ボーナス）が最大の子を選ぶ（未訪問の子を優先）
+    """
+    def _mcts_select_child(self, node: int) -> int:
+        visits = self.mcts_visits
+        wins = self.mcts_wins
+        log_parent = math.log(visits[node] + 1)
+        exploration = self.mcts_exploration
+        
+        best_child = -1
+        best_value = -1.0
+        for child in range(self.mcts_first_child[node], self.mcts_first_child[node] + self.mcts_child_count[node]):
+            child_visits = visits[child]
+            if child_visits == 0:
+                return child
+            value = wins[child] / child_visits + exploration * math.sqrt(log_parent / child_visits)
+            if value > best_value:
+                best_value = value
+                best_child = child
+        return best_child
+    
+    """
+    ランダムプレイアウト（ビットボード上で満杯か勝敗がつくまで打つ）
+    勝者のプレイヤー番号、引き分けなら0を返す
+    """
+    def _mcts_playout(self, black_board: int, white_board: int, player: int) -> int:
+        choice = self.mcts_random.choice
+        
+        while True:
+            playable = self._get_playable_bb(black_board, white_board)
+            if not playable:
+                return 0
+            
+            bits = []
+            while playable:
+                bit = playable & -playable
+                bits.append(bit)
+                playable ^= bit
+            bit = choice(bits)
+            
+            if player == 1:
+                black_board |= bit
+                if self._check_win_at(black_board, bit.bit_length() - 1):
+                    return 1
+            else:
+                white_board |= bit
+                if self._check_win_at(white_board, bit.bit_length() - 1):
+                    return 2
+            player = 3 - player
     
     # ===== 盤面評価関数 =====
     
     """
-    ビットボード版盤面評価関数
-    勝利状態の特別評価 + 連続性（脅威）の評価
+    勝敗のついていない盤面の評価関数（探索の葉ノード用、playerから見た評価値）
+    勝敗判定は着手時に_check_win_atで済ませているので、脅威の評価だけを行う
+    脅威の評価値は着手ごとに差分更新しているline_scoreを読むだけ（O(1)）
     """
-    def _evaluate_board_bb(self, black_board: int, white_board: int) -> float:
-        if self.player_num is None:
-            return 0.0
+    def _evaluate_position_bb(self, black_board: int, white_board: int, player: int) -> float:
+        line_score = self.search_state.line_score
+        score = line_score if player == 1 else -line_score
         
-        player_board = black_board if self.player_num == 1 else white_board
-        opponent_board = white_board if self.player_num == 1 else black_board
+        if self.debug_eval:
+            assert not (self._check_win_bb(black_board) or self._check_win_bb(white_board)), "勝敗のついた葉ノード"
+            player_board = black_board if player == 1 else white_board
+            opponent_board = white_board if player == 1 else black_board
+            expected = (self._evaluate_threats_bb(player_board, opponent_board)
+                        - self._evaluate_threats_bb(opponent_board, player_board))
+            reference = (self._evaluate_threats_by_patterns(player_board, opponent_board)
+                         - self._evaluate_threats_by_patterns(opponent_board, player_board))
+            assert expected == reference, "ビット並列の評価値がパターン走査と不一致"
+            assert score == expected, "差分評価値不一致"
         
-        if self._check_win_bb(player_board):
-            return 1000.0
-        if self._check_win_bb(opponent_board):
-            return -1000.0
+        if self.eval_mode == "parity":
+            score += self._evaluate_parity_threats_bb(black_board, white_board, player)
+        
+        return score
+    
+    """
+    重力を考慮した脅威マスの評価（parityモード、playerから見た評価値）
+    脅威マスを次の4種類に分けてビット演算で数える
+    - すぐ打てる脅威: 着手可能マスにある。手番側なら次の手で勝ち、相手側なら受けを強制できる
+    - 有利な段の脅威: 終盤に列が埋まっていくと自分の番で打てる段（黒はz=0,2、白はz=1,3）
+    - 不利な段の脅威: 相手の番で回ってくるので、相手に塞がれやすい
+    - 死んだ脅威: 真下が相手の脅威マスなので、そこを塞いだ時点で相手に塞がれる
+    """
+    def _evaluate_parity_threats_bb(self, black_board: int, white_board: int, player: int) -> float:
+        playable = self._get_playable_bb(black_board, white_board)
+        black_threats = self._winning_cells_bb(black_board, white_board)
+        white_threats = self._winning_cells_bb(white_board, black_board)
         
-        player_score = self._evaluate_threats_bb(player_board, opponent_board)
-        opponent_score = self._evaluate_threats_bb(opponent_board, player_board)
+        # 手番側がすぐ打てる脅威マスを持っていれば次の手で勝てる
+        my_threats = black_threats if player == 1 else white_threats
+        if my_threats & playable:
+            return 500.0
         
-        return player_score - opponent_score
+        immediate_weight, favorable_weight, unfavorable_weight, dead_weight = self.parity_weights
+        score = 0.0
+        
+        for threats, opp_threats, favorable_layers, sign in ((black_threats, white_threats, ODD_LAYERS, 1.0),
+                                                              (white_threats, black_threats, EVEN_LAYERS, -1.0)):
+            dead = threats & (opp_threats << 16)
+            live = threats & ~dead
+            immediate = live & playable
+            later = live & ~playable
+            score += sign * (immediate_weight * popcount(immediate)
+                             + favorable_weight * popcount(later & favorable_layers)
+                             + unfavorable_weight * popcount(later & ~favorable_layers)
+                             + dead_weight * popcount(dead))
+        
+        return score if player == 1 else -score
+    
+    # ===== ライン単位の差分評価 =====
+    
+    """
+    探索中の局面(search_state)を盤面全体から作り直す（探索のルートで1回だけ）
+    ハッシュ値・列の高さ・ライン集計・評価値・対称ハッシュ・脅威マップを全計算し、手の履歴を空にする
+    着手ごとの差分更新はSearchState.make / unmakeが行う
+    """
+    def _init_search_state(self, black_board: int, white_board: int, player: int, hash_key: int):
+        state = self.search_state
+        state.black = black_board
+        state.white = white_board
+        state.player = player
+        state.hash_key = hash_key
+        occupied = black_board | white_board
+        state.heights = [popcount(occupied & mask) for mask in self.column_masks]
+        state.ply = 0
+        
+        score = 0.0
+        for index, pattern in enumerate(self.win_patterns):
+            code = popcount(black_board & pattern) + 5 * popcount(white_board & pattern)
+            state.line_counts[index] = code
+            score += self.line_values[code]
+        state.line_score = score
+        
+        state.use_symmetry = self.use_symmetry
+        if self.use_symmetry:
+            state.symmetry_stack[0][:] = self._compute_symmetry_hashes(black_board, white_board)
+        state.symmetry_hashes = state.symmetry_stack[0]
+        state.threat_cells = [0, self._winning_cells_bb(black_board, white_board), 
+                              self._winning_cells_bb(white_board, black_board)]
     
     """
-    ビットボード版脅威評価【高速ビットカウント版】
-    勝利パターンから自分の石の連続性を評価（3つ並び50点、2つ並び10点、1つ1点）
-    従来のbin().count('1')より3-5倍高速なpopcount()を使用
+    ビットボード版脅威評価【方向ごとのビット並列版】
+    相手の石がないラインの自分の石数で評価（3つ並び50点、2つ並び10点、1つ1点）
+    13方向それぞれで、始点pのラインの4マス(p, p+d, p+2d, p+3d)を右シフトで始点の位置にそろえ、
+    4ビットの足し算をビットごとに並列に行って（1の位ones・2の位twos）全ラインの石数を一度に求める
+    始点マスクが盤端での折り返しを除くので、結果は_evaluate_threats_by_patternsと完全に一致する
     """
     def _evaluate_threats_bb(self, my_board: int, opp_board: int) -> float:
+        free = ~opp_board & FULL_BOARD  # 相手の石がないマス
+        score = 0
+        
+        for step, starts in self.line_directions:
+            # 4マスとも相手の石がないラインの始点
+            lines = starts & free & (free >> step) & (free >> (2 * step)) & (free >> (3 * step))
+            if not lines:
+                continue
+            a0 = my_board & lines
+            a1 = (my_board >> step) & lines
+            a2 = (my_board >> (2 * step)) & lines
+            a3 = (my_board >> (3 * step)) & lines
+            
+            # 石数 = ones + 2 * twos（4つ揃いは ones = twos = 0 になり、勝敗判定側で扱う）
+            sum01, sum23 = a0 ^ a1, a2 ^ a3
+            ones = sum01 ^ sum23
+            twos = (a0 & a1) ^ (a2 & a3) ^ (sum01 & sum23)
+            
+            score += (50 * popcount(ones & twos)      # 3つ
+                      + 10 * popcount(twos & ~ones)   # 2つ
+                      + popcount(ones & ~twos))       # 1つ
+        
+        return float(score)
+    
+    """
+    脅威評価の参照実装（勝利パターンを1本ずつ調べる）
+    _evaluate_threats_bbの検証用（debug_eval）
+    """
+    def _evaluate_threats_by_patterns(self, my_board: int, opp_board: int) -> float:
         score = 0.0
         
         for pattern in self.win_patterns:
@@ -509,8 +2026,26 @@ class MyAI(Alg3D):
     
     """
     互換性のための関数 - Alpha-Beta探索
+    maximizing_playerから見た評価値を返す（内部のNegamax探索は手番側から見た値）
     """
     def alpha_beta(self, board: list[list[list[int]]], depth: int, alpha: float, beta: float, 
                    maximizing_player: bool, current_player: int) -> tuple[float, Optional[tuple[int, int]]]:
         black_board, white_board = self._convert_to_bitboard(board)
-        return self._alpha_beta_with_tt(black_board, white_board, depth, alpha, beta, maximizing_player, current_player)
\ No newline at end of file
+        self.deadline = math.inf  # 深さ固定の探索なので時間では打ち切らない
+        hash_key = self._compute_zobrist_hash(black_board, white_board)
+        self._init_search_state(black_board, white_board, current_player, hash_key)
+        self.search_depth = depth
+        self.root_moves = FULL_BOARD
+        self.pv_hint = -1
+        self.root_researches = 0
+        if alpha == -math.inf and beta == math.inf:
+            # 全幅の窓なら get_move と同じルートの探索方法（root_driver）を使い、評価値を次の呼び出しの窓の中心にする
+            # （get_moveの窓の中心 last_root_score は変えない）
+            score, best_move = self._search_root(depth, self.alpha_beta_root_score)
+            self.alpha_beta_root_score = score
+        elif maximizing_player:
+            return self._alpha_beta_with_tt(depth, alpha, beta)
+        else:
+            score, best_move = self._alpha_beta_with_tt(depth, -beta, -alpha)
+            return -score, best_move
+        return (score, best_move) if maximizing_player else (-score, best_move)
\ No newline at end of file
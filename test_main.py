@@ -0,0 +1,185 @@
+# === test_main.py ===
+# main.py の探索部品のテスト（ローカル専用）
+# 使い方: python -m pytest -q test_main.py   （pytestがなければ python -m unittest test_main）
+import json
+import os
+import random
+import sys
+import unittest
+
+import local_driver
+
+# main.py は本番用に framework から Alg3D を import するので、ローカルでは local_driver で代用する
+sys.modules.setdefault("framework", local_driver)
+
+import main  # noqa: E402
+
+
+def random_boards(rng: random.Random, gravity: bool) -> tuple[int, int]:
+    """ランダムな (黒, 白)。gravityなら重力どおりに交互に打った盤面、そうでなければ任意のマス配置"""
+    black_board = white_board = 0
+    if gravity:
+        heights = [0] * 16
+        for ply in range(rng.randrange(65)):
+            column = rng.choice([column for column in range(16) if heights[column] < 4])
+            bit = 1 << (heights[column] * 16 + column)
+            heights[column] += 1
+            if ply % 2 == 0:
+                black_board |= bit
+            else:
+                white_board |= bit
+    else:
+        for position in range(64):
+            value = rng.randrange(3)
+            if value == 1:
+                black_board |= 1 << position
+            elif value == 2:
+                white_board |= 1 << position
+    return black_board, white_board
+
+
+class EvaluateThreatsTest(unittest.TestCase):
+    """ビット並列の脅威評価(_evaluate_threats_bb)が勝利パターン走査の1/10/50点と一致すること"""
+
+    def setUp(self):
+        self.ai = main.MyAI()
+
+    def assert_same_score(self, black_board: int, white_board: int):
+        for my_board, opp_board in ((black_board, white_board), (white_board, black_board)):
+            self.assertEqual(self.ai._evaluate_threats_bb(my_board, opp_board),
+                             self.ai._evaluate_threats_by_patterns(my_board, opp_board),
+                             (hex(my_board), hex(opp_board)))
+
+    def test_random_boards(self):
+        rng = random.Random(2024)
+        for _ in range(2000):
+            self.assert_same_score(*random_boards(rng, gravity=True))
+            self.assert_same_score(*random_boards(rng, gravity=False))
+
+    def test_empty_and_full_boards(self):
+        self.assertEqual(self.ai._evaluate_threats_bb(0, 0), 0.0)
+        self.assert_same_score(0, 0)
+        self.assertEqual(self.ai._evaluate_threats_bb(main.FULL_BOARD, 0),
+                         self.ai._evaluate_threats_by_patterns(main.FULL_BOARD, 0))
+        rng = random.Random(7)
+        for _ in range(200):
+            black_board = rng.getrandbits(64)
+            self.assert_same_score(black_board, main.FULL_BOARD & ~black_board)
+
+    def test_completed_lines(self):
+        # 4つ揃ったラインは1/10/50点のどれにも数えない（勝敗判定側で扱う）
+        rng = random.Random(11)
+        for pattern in main.WIN_PATTERNS:
+            self.assert_same_score(pattern, 0)
+            black_board, white_board = random_boards(rng, gravity=False)
+            self.assert_same_score(black_board | pattern, white_board & ~pattern)
+
+    def test_known_scores(self):
+        # 角の1石は7本のラインに1点ずつ、横に3つ並べば50点
+        corner_lines = len(main.CELL_LINES[0])
+        self.assertEqual(corner_lines, 7)
+        self.assertEqual(self.ai._evaluate_threats_bb(1, 0), 7.0)
+        three = 0b0111
+        self.assertEqual(self.ai._evaluate_threats_bb(three, 0),
+                         self.ai._evaluate_threats_by_patterns(three, 0))
+        self.assertEqual(self.ai._evaluate_threats_bb(three, 0b1000),
+                         self.ai._evaluate_threats_bb(three, 0) - 50.0)
+
+
+def search_state_fields(state: main.SearchState) -> dict:
+    """make / unmake で戻るべき SearchState の値（リストはコピーして比べる）"""
+    return {"black": state.black, "white": state.white, "player": state.player, "hash_key": state.hash_key,
+            "heights": list(state.heights), "ply": state.ply, "line_counts": list(state.line_counts),
+            "line_score": state.line_score, "symmetry_hashes": list(state.symmetry_hashes),
+            "threat_cells": list(state.threat_cells)}
+
+
+def board_from_moves(moves: list) -> local_driver.Board:
+    """(x, y) の着手列を先手から交互に打った盤面"""
+    board = local_driver.create_board()
+    for ply, (x, y) in enumerate(moves):
+        z = next(z for z in range(4) if board[z][y][x] == 0)
+        board[z][y][x] = 1 if ply % 2 == 0 else 2
+    return board
+
+
+class SearchStateTest(unittest.TestCase):
+    """SearchState の make / unmake が差分更新した値を正しく進め、正しく戻すこと"""
+
+    def setUp(self):
+        self.ai = main.MyAI()
+        self.state = self.ai.search_state
+
+    def test_make_matches_full_rebuild_and_unmake_restores(self):
+        rng = random.Random(5)
+        reference = main.MyAI()
+        for _ in range(100):
+            black_board, white_board = random_boards(rng, gravity=True)
+            player = 1 if main.popcount(black_board) == main.popcount(white_board) else 2
+            self.ai._init_search_state(black_board, white_board, player,
+                                       self.ai._compute_zobrist_hash(black_board, white_board))
+            history = [search_state_fields(self.state)]
+
+            # 着手可能な列にランダムに打ち進め、毎手全計算した局面と比べる
+            while self.state.ply < 12:
+                playable = self.ai._get_playable_bb(self.state.black, self.state.white)
+                if not playable:
+                    break
+                columns = [column for column in range(16) if playable & self.ai.column_masks[column]]
+                self.state.make(rng.choice(columns), True)
+                history.append(search_state_fields(self.state))
+
+                reference._init_search_state(self.state.black, self.state.white, self.state.player,
+                                             reference._compute_zobrist_hash(self.state.black, self.state.white))
+                expected = search_state_fields(reference.search_state)
+                expected["ply"] = self.state.ply
+                self.assertEqual(history[-1], expected)
+
+            # 1手ずつ戻し、打つ前の値（盤面・手番・ハッシュ・列の高さ・ライン集計・対称ハッシュ・脅威マップ）に戻ること
+            while self.state.ply:
+                history.pop()
+                self.state.unmake()
+                self.assertEqual(search_state_fields(self.state), history[-1])
+
+    def test_unmake_restores_threats_not_updated(self):
+        # 浅いノードでは脅威マップを更新しないが、それでもunmakeで元に戻ること
+        self.ai._init_search_state(0, 0, 1, 0)
+        before = search_state_fields(self.state)
+        for column in (5, 5, 6, 9):
+            self.state.make(column, False)
+        for _ in range(4):
+            self.state.unmake()
+        self.assertEqual(search_state_fields(self.state), before)
+
+
+class FixedDepthSearchTest(unittest.TestCase):
+    """
+    深さ固定のalpha_betaの評価値・最善手・ノード数が基準値どおりであること
+    基準値は SearchState 導入前（引数で盤面を渡していた探索）の結果（bench_positions.json の局面、深さ5）
+    """
+    EXPECTED = {
+        "ORIM@6": (42.0, (1, 3), 4489),
+        "ee@26": (91.0, (0, 3), 4917),
+        "err@11": (32.0, (2, 2), 4569),
+        "Bit_board2@28": (1002.0, (0, 0), 2239),
+        "fix_depth_logic_bb_1@15": (-1003.0, (2, 0), 3),
+    }
+
+    def test_corpus_positions(self):
+        with open(os.path.join(os.path.dirname(os.path.abspath(__file__)), "bench_positions.json"),
+                  encoding="utf-8") as file:
+            corpus = {position["name"]: position["moves"] for position in json.load(file)}
+
+        for name, (score, move, nodes) in self.EXPECTED.items():
+            with self.subTest(name=name):
+                moves = corpus[name]
+                player = 1 if len(moves) % 2 == 0 else 2
+                ai = main.MyAI()
+                ai.player_num = player
+                result = ai.alpha_beta(board_from_moves(moves), 5, -float("inf"), float("inf"), True, player)
+                self.assertEqual(result, (score, move))
+                self.assertEqual(ai.nodes, nodes)
+
+
+if __name__ == "__main__":
+    unittest.main()
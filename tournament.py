@@ -0,0 +1,364 @@
+# === tournament.py ===
+# 複数のAIファイルを総当たりで対戦させるローカル専用の大会ランナー
+# 使い方: python tournament.py main.py mainoriBB.py "main.py:search_backend='mcts'" --rounds 4
+#   エンジン指定は「ファイル[:属性=値,属性=値]」。属性はload_ai後のMyAIインスタンスに設定する
+#   （例: main.py:time_limit=1.0,eval_mode='parity'）
+#   各組み合わせを先手・後手を入れ替えて --rounds 回ずつ対戦し、全コアで並列に実行する
+#   --limits を付けるとサーバと同じCPU時間・メモリ制限の子プロセスで各AIを動かす（limit_driver.py）
+#   --trace FILE を付けると各AIの collect_stats を有効にし、1手ごとの探索統計をJSON Lines で保存する
+import argparse
+import ast
+import json
+import multiprocessing
+import os
+import random
+import time
+
+import local_driver
+from limit_driver import DEFAULT_CPU_LIMIT, DEFAULT_MEMORY_LIMIT_MB, LimitedEngine
+
+COLOR_NAMES = {1: "黒", 2: "白"}
+
+
+def generate_win_lines() -> list[tuple[tuple[int, int, int], ...]]:
+    """審判用の勝利ライン（76本）をエンジンとは独立に作る"""
+    directions = [
+        (1, 0, 0), (0, 1, 0), (0, 0, 1),
+        (1, 1, 0), (1, -1, 0), (1, 0, 1), (1, 0, -1), (0, 1, 1), (0, 1, -1),
+        (1, 1, 1), (1, 1, -1), (1, -1, 1), (-1, 1, 1),
+    ]
+    lines = []
+    for z in range(4):
+        for y in range(4):
+            for x in range(4):
+                for dx, dy, dz in directions:
+                    cells = tuple((x + i * dx, y + i * dy, z + i * dz) for i in range(4))
+                    if all(0 <= cx < 4 and 0 <= cy < 4 and 0 <= cz < 4 for cx, cy, cz in cells):
+                        lines.append(cells)
+    return lines
+
+
+WIN_LINES = generate_win_lines()
+
+
+def parse_engine_spec(spec: str) -> tuple[str, dict]:
+    """「ファイル[:属性=値,属性=値]」を (ファイル, {属性: 値}) に分解する"""
+    path, _, options = spec.partition(":")
+    attributes = {}
+    for option in filter(None, options.split(",")):
+        key, _, value = option.partition("=")
+        try:
+            attributes[key.strip()] = ast.literal_eval(value.strip())
+        except (ValueError, SyntaxError):
+            attributes[key.strip()] = value.strip()
+    return path, attributes
+
+
+def engine_names(specs: list[str]) -> list[str]:
+    """ログと集計表に使うエンジン名（ファイル名 + 属性、重複には番号を付ける）"""
+    names = []
+    for spec in specs:
+        path, attributes = parse_engine_spec(spec)
+        name = os.path.splitext(os.path.basename(path))[0]
+        if attributes:
+            name += "[" + ",".join(f"{key}={value}" for key, value in attributes.items()) + "]"
+        while name in names:
+            name += "'"
+        names.append(name)
+    return names
+
+
+def load_engine(spec: str, limits: tuple = None, trace: bool = False):
+    """
+    load_aiでMyAIを作り、指定された属性を設定する
+    limits=(CPU秒, メモリMB) なら制限付きの子プロセスで動かす LimitedEngine を返す
+    trace=True なら探索統計(collect_stats)を有効にする
+    """
+    path, attributes = parse_engine_spec(spec)
+    if trace:
+        attributes["collect_stats"] = True
+    if limits:
+        return LimitedEngine(path, attributes, *limits)
+    ai = local_driver.load_ai(path)
+    for key, value in attributes.items():
+        setattr(ai, key, value)
+    return ai
+
+
+def search_trace(ai):
+    """直前のget_moveの探索統計を辞書で返す（統計を出さないエンジンならNone）"""
+    stats = getattr(ai, "last_stats", None)
+    if stats is not None:
+        return stats.get("search")
+    stats = getattr(ai, "stats", None)
+    return stats.to_dict() if hasattr(stats, "to_dict") else None
+
+
+def copy_board(board: local_driver.Board) -> local_driver.Board:
+    return [[row[:] for row in layer] for layer in board]
+
+
+def drop_height(board: local_driver.Board, x: int, y: int) -> int:
+    """(x, y)の列で次に石が入るz座標（満杯なら-1）"""
+    for z in range(4):
+        if board[z][y][x] == 0:
+            return z
+    return -1
+
+
+def forced_move(board: local_driver.Board) -> tuple[int, int]:
+    """サーバと同じく、左上から順に見て最初に置けるマスを返す"""
+    for y in range(4):
+        for x in range(4):
+            if drop_height(board, x, y) >= 0:
+                return x, y
+    return 0, 0
+
+
+def is_win(board: local_driver.Board, player: int) -> bool:
+    return any(all(board[z][y][x] == player for x, y, z in line) for line in WIN_LINES)
+
+
+def validate_move(board: local_driver.Board, move) -> bool:
+    """get_moveの戻り値が置ける(x, y)かどうか"""
+    if not isinstance(move, (tuple, list)) or len(move) != 2:
+        return False
+    x, y = move
+    if not isinstance(x, int) or not isinstance(y, int) or not (0 <= x < 4 and 0 <= y < 4):
+        return False
+    return drop_height(board, x, y) >= 0
+
+
+def play_game(ais: dict, names: dict, opening: list[tuple[int, int]]) -> dict:
+    """
+    1局対戦する
+
+    Args:
+        ais: {1: 先手のMyAI, 2: 後手のMyAI}
+        names: {1: 先手の名前, 2: 後手の名前}
+        opening: 最初に両者に代わって打つ手（同じエンジン同士の対局を散らすため）
+
+    Returns:
+        dict: winner(0は引き分け), moves, log(サーバ形式の行), think_time({1: 秒, 2: 秒}), max_think_time,
+              max_rss({1: MB, 2: MB}、制限付きのときだけ), forced({1: 強制配置の回数, 2: 回数}),
+              trace(手ごとの探索統計のリスト)
+    """
+    board = local_driver.create_board()
+    last_move = (None, None, None)
+    log_lines = []
+    think_time = {1: 0.0, 2: 0.0}
+    max_think_time = {1: 0.0, 2: 0.0}
+    max_rss = {1: None, 2: None}
+    forced = {1: 0, 2: 0}
+    trace = []
+
+    for turn in range(64):
+        player = 1 if turn % 2 == 0 else 2
+        note = ""
+        stats = None
+
+        if turn < len(opening):
+            move = opening[turn]
+        else:
+            start = time.process_time()
+            try:
+                move = ais[player].get_move(copy_board(board), player, last_move)
+            except Exception:
+                move = None
+                note = "異常終了した"
+            elapsed = time.process_time() - start
+
+            # 制限付きの子プロセスなら、親の時間ではなく子が実際に使ったCPU時間を記録する
+            stats = getattr(ais[player], "last_stats", None)
+            if stats:
+                elapsed = stats["cpu"]
+                if stats["rss_mb"] is not None:
+                    max_rss[player] = max(max_rss[player] or 0.0, stats["rss_mb"])
+            think_time[player] += elapsed
+            max_think_time[player] = max(max_think_time[player], elapsed)
+
+            if note:
+                move = forced_move(board)
+            elif not validate_move(board, move):
+                note = "無効座標を返した"
+                move = forced_move(board)
+            if note:
+                forced[player] += 1
+
+            search = search_trace(ais[player])
+            if search is not None and not note:
+                trace.append({"ply": turn + 1, "engine": names[player], "player": player, **search})
+
+        x, y = move
+        z = drop_height(board, x, y)
+        board[z][y][x] = player
+        last_move = (x, y, z)
+
+        line = f"{turn + 1}手目  {names[player]} : {COLOR_NAMES[player]} : ({x}, {y})"
+        if turn < len(opening):
+            line += "  ※ランダム序盤"  # エンジンが選んだ手ではない
+        if note:
+            line += f"  ※{note}ため、 ({x}, {y})に強制配置"
+        if stats:
+            rss = "-" if stats["rss_mb"] is None else f"{stats['rss_mb']:.0f}MB"
+            line += f"  [CPU {stats['cpu']:.2f}秒 / 最大RSS {rss}]"
+        log_lines.append(line)
+        log_lines.append("")
+
+        if is_win(board, player):
+            log_lines.append(f"🎉 {names[player]} が {turn + 1}手で勝利！")
+            return {"winner": player, "moves": turn + 1, "log": log_lines, "think_time": think_time,
+                    "max_think_time": max_think_time, "max_rss": max_rss, "forced": forced, "trace": trace}
+
+    log_lines.append("引き分け")
+    return {"winner": 0, "moves": 64, "log": log_lines, "think_time": think_time,
+            "max_think_time": max_think_time, "max_rss": max_rss, "forced": forced, "trace": trace}
+
+
+def run_match(job: tuple) -> dict:
+    """プロセスプールで実行する1局分の処理（エンジンは対局ごとに新しく読み込む）"""
+    game_id, black_index, white_index, specs, names, opening, log_dir, limits, trace = job
+    ais = {1: load_engine(specs[black_index], limits, trace), 2: load_engine(specs[white_index], limits, trace)}
+    players = {1: names[black_index], 2: names[white_index]}
+    try:
+        result = play_game(ais, players, opening)
+    finally:
+        for ai in ais.values():
+            if hasattr(ai, "close"):
+                ai.close()
+
+    if log_dir:
+        file_name = f"game{game_id:03d}_{players[1]}_vs_{players[2]}.log"
+        file_name = "".join(c if c.isalnum() or c in "._-" else "_" for c in file_name)
+        with open(os.path.join(log_dir, file_name), "w", encoding="utf-8") as file:
+            file.write("\n".join(result["log"]) + "\n")
+
+    result.update({"game_id": game_id, "black": black_index, "white": white_index})
+    del result["log"]
+    return result
+
+
+def random_opening(rng: random.Random, plies: int) -> list[tuple[int, int]]:
+    """まだ埋まっていない列からランダムに plies 手を選ぶ（64手を超える分は打てないので切り詰める）"""
+    heights = {(x, y): 0 for y in range(4) for x in range(4)}
+    opening = []
+    for _ in range(min(plies, 64)):
+        x, y = rng.choice([column for column, height in heights.items() if height < 4])
+        heights[(x, y)] += 1
+        opening.append((x, y))
+    return opening
+
+
+def make_jobs(specs: list[str], names: list[str], rounds: int, opening_plies: int,
+              seed: int, log_dir: str, limits: tuple = None, trace: bool = False) -> list[tuple]:
+    """総当たり × 先後入れ替え × rounds の対局リストを作る（同じ序盤で先後を入れ替える）"""
+    rng = random.Random(seed)
+    jobs = []
+    for first in range(len(specs)):
+        for second in range(first + 1, len(specs)):
+            for _ in range(rounds):
+                opening = random_opening(rng, opening_plies)
+                for black_index, white_index in ((first, second), (second, first)):
+                    jobs.append((len(jobs) + 1, black_index, white_index, specs, names, opening, log_dir,
+                                 limits, trace))
+    return jobs
+
+
+def summarize(names: list[str], results: list[dict]) -> str:
+    """エンジンごとの成績表と対戦表を作る"""
+    count = len(names)
+    stats = [{"win": 0, "loss": 0, "draw": 0, "win_moves": 0, "think": 0.0, "max_think": 0.0, "games": 0,
+              "forced": 0, "max_rss": None} for _ in range(count)]
+    head_to_head = [[0.0] * count for _ in range(count)]
+
+    for result in results:
+        for player, index in ((1, result["black"]), (2, result["white"])):
+            opponent = result["white"] if player == 1 else result["black"]
+            entry = stats[index]
+            entry["games"] += 1
+            entry["think"] += result["think_time"][player]
+            entry["max_think"] = max(entry["max_think"], result["max_think_time"][player])
+            entry["forced"] += result["forced"][player]
+            if result["max_rss"][player] is not None:
+                entry["max_rss"] = max(entry["max_rss"] or 0.0, result["max_rss"][player])
+            if result["winner"] == 0:
+                entry["draw"] += 1
+                head_to_head[index][opponent] += 0.5
+            elif result["winner"] == player:
+                entry["win"] += 1
+                entry["win_moves"] += result["moves"]
+                head_to_head[index][opponent] += 1.0
+            else:
+                entry["loss"] += 1
+
+    width = max(len(name) for name in names)
+    lines = [f"{'エンジン':<{width}}  勝  敗  分  勝率    平均勝利手数  合計思考時間  最大思考時間  強制配置  最大RSS"]
+    for index, name in enumerate(names):
+        entry = stats[index]
+        games = entry["games"] or 1
+        rate = (entry["win"] + 0.5 * entry["draw"]) / games * 100
+        average_moves = entry["win_moves"] / entry["win"] if entry["win"] else 0.0
+        rss = "-" if entry["max_rss"] is None else f"{entry['max_rss']:.0f}MB"
+        lines.append(f"{name:<{width}}  {entry['win']:>2}  {entry['loss']:>2}  {entry['draw']:>2}  "
+                     f"{rate:5.1f}%  {average_moves:12.1f}  {entry['think']:11.1f}秒  {entry['max_think']:11.2f}秒  "
+                     f"{entry['forced']:>8}  {rss:>7}")
+
+    lines.append("")
+    lines.append("対戦表（行のエンジンが列のエンジンから得た勝ち点、引き分けは0.5）")
+    lines.append(" " * width + "  " + "  ".join(f"{index:>5}" for index in range(count)))
+    for index, name in enumerate(names):
+        cells = "  ".join("    -" if index == other else f"{head_to_head[index][other]:5.1f}"
+                          for other in range(count))
+        lines.append(f"{name:<{width}}  {cells}")
+    lines.append("列番号: " + ", ".join(f"{index}={name}" for index, name in enumerate(names)))
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="AIファイル同士の総当たり大会を並列に実行する")
+    parser.add_argument("engines", nargs="+", help="AIファイル（ファイル[:属性=値,...]）")
+    parser.add_argument("--rounds", type=int, default=2, help="組み合わせごとの対局数（先後1組で1回）")
+    parser.add_argument("--opening-plies", type=int, default=2, help="対局を散らすためにランダムに打つ序盤の手数")
+    parser.add_argument("--seed", type=int, default=0, help="序盤のランダム手の乱数シード")
+    parser.add_argument("--processes", type=int, default=os.cpu_count(), help="並列に対局するプロセス数")
+    parser.add_argument("--log-dir", default="tournament_logs", help="対局ログの保存先（空文字で保存しない）")
+    parser.add_argument("--limits", action="store_true", help="サーバと同じCPU時間・メモリ制限の子プロセスで対局する")
+    parser.add_argument("--cpu-limit", type=float, default=DEFAULT_CPU_LIMIT, help="--limits の1手あたりCPU時間（秒）")
+    parser.add_argument("--memory-limit", type=float, default=DEFAULT_MEMORY_LIMIT_MB, help="--limits のメモリ制限（MB）")
+    parser.add_argument("--trace", help="1手ごとの探索統計を書き出すJSON Linesファイル")
+    args = parser.parse_args()
+
+    if len(args.engines) < 2:
+        raise SystemExit("エンジンを2つ以上指定してください")
+    if args.log_dir:
+        os.makedirs(args.log_dir, exist_ok=True)
+
+    names = engine_names(args.engines)
+    limits = (args.cpu_limit, args.memory_limit) if args.limits else None
+    jobs = make_jobs(args.engines, names, args.rounds, args.opening_plies, args.seed, args.log_dir, limits,
+                     bool(args.trace))
+    print(f"{len(names)}エンジン / {len(jobs)}局 / {args.processes}プロセス")
+
+    start = time.time()
+    results = []
+    with multiprocessing.Pool(args.processes) as pool:
+        for result in pool.imap_unordered(run_match, jobs):
+            results.append(result)
+            winner = {0: "引き分け", 1: names[result["black"]], 2: names[result["white"]]}[result["winner"]]
+            print(f"  game{result['game_id']:03d}: {names[result['black']]}(黒) vs "
+                  f"{names[result['white']]}(白) → {winner} ({result['moves']}手)")
+
+    results.sort(key=lambda result: result["game_id"])
+    print(f"\n{len(results)}局 / {time.time() - start:.1f}秒\n")
+    print(summarize(names, results))
+
+    if args.trace:
+        with open(args.trace, "w", encoding="utf-8") as file:
+            for result in results:
+                for record in result["trace"]:
+                    file.write(json.dumps({"game": result["game_id"], **record}, ensure_ascii=False) + "\n")
+        print(f"\n探索統計を {args.trace} に保存しました")
+
+
+if __name__ == "__main__":
+    main()